@@ -1,87 +1,230 @@
 import sqlite3
 import os
-import datetime
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+import numpy as np
+
+# Bump when the schema in _create_tables changes; gate migrations on PRAGMA user_version
+SCHEMA_VERSION = 1
+
+# SQL for the frequently run statements. Passing the same string objects on every call
+# keeps them hot in sqlite3's prepared-statement cache instead of re-parsing them.
+_SQL_GET_VIDEO_ID = "SELECT id FROM videos WHERE project_id = ? AND name = ?"
+_SQL_INSERT_VIDEO = "INSERT INTO videos (project_id, name, fps, frame_count) VALUES (?, ?, ?, ?)"
+_SQL_INSERT_RECTANGLE = """
+    INSERT OR IGNORE INTO rectangles (video_id, frame_index, class_id, x1, y1, x2, y2)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_GET_RECTANGLES_FOR_FRAME = """
+    SELECT id, video_id, frame_index, class_id, x1, y1, x2, y2, created_at
+    FROM rectangles
+    WHERE video_id = ? AND frame_index = ?
+"""
+_SQL_GET_RECTANGLE_ROWS_FOR_VIDEO = """
+    SELECT frame_index, class_id, x1, y1, x2, y2
+    FROM rectangles
+    WHERE video_id = ?
+    ORDER BY frame_index
+"""
 
 class Database:
     def __init__(self, db_path="videos.db"):
         """Initialize the database connection"""
         self.db_path = db_path
-        self.conn = None
-        self.cursor = None
-        self._connect()
+        # Each thread gets its own connection, so a worker thread can read while the GUI
+        # thread writes (WAL allows one writer alongside any number of readers)
+        self._local = threading.local()
+        self._connections = []  # Every thread's connection, so close() can close them all
+        self._connections_lock = threading.Lock()
+        self._get_conn()
         self._create_tables()
+
+    def _get_conn(self):
+        """Return this thread's (connection, cursor), connecting on first use"""
+        state = self._thread_state()
+        return state.conn, state.cursor
+
+    def _thread_state(self):
+        """Return the calling thread's connection state, creating it if needed"""
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            with self._connections_lock:
+                if self.db_path == ":memory:" and self._connections:
+                    # Each connection to :memory: would be a separate empty database
+                    state = self._connections[0]
+                else:
+                    state = self._connect()
+                    self._connections.append(state)
+            self._local.state = state
+        return state
+
+    # The methods below use these as before; they now resolve to the calling thread's connection
+    @property
+    def conn(self):
+        return self._thread_state().conn
+
+    @property
+    def cursor(self):
+        return self._thread_state().cursor
+
+    @property
+    def _cursor_frame_rects(self):
+        return self._thread_state().cursor_frame_rects
+
+    @property
+    def _cursor_save_rect(self):
+        return self._thread_state().cursor_save_rect
     
     def _connect(self):
-        """Connect to the SQLite database"""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
+        """Open a new connection to the SQLite database and configure it"""
+        # Autocommit mode: statements outside transaction() commit on their own,
+        # and transaction() decides where the durable commit points are.
+        # check_same_thread is off only so close() can close every thread's connection.
+        conn = sqlite3.connect(
+            self.db_path, isolation_level=None, cached_statements=256, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+
+        # WAL gives sequential log writes and lets readers proceed while a save commits.
+        # In-memory databases can't use WAL, so only switch for file-backed ones.
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable in WAL mode and avoids an fsync on every commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")  # Negative means KiB, so ~20 MB
+        # Read pages straight from the OS page cache instead of copying them through read()
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        conn.execute("PRAGMA foreign_keys=ON")
+
+        return SimpleNamespace(
+            conn=conn,
+            cursor=conn.cursor(),
+            # Dedicated cursors for the per-frame read and the rectangle save, so those
+            # statements are never reset by whatever else ran on the shared cursor
+            cursor_frame_rects=conn.cursor(),
+            cursor_save_rect=conn.cursor(),
+            transaction_depth=0,  # Nesting level of transaction() blocks on this connection
+        )
+
+    @contextmanager
+    def transaction(self):
+        """Group several statements into one transaction (commit on success, rollback on error).
+
+        Nested blocks join the outermost transaction, so helpers that open their
+        own transaction can still be batched together by a caller.
+        """
+        state = self._thread_state()
+        if state.transaction_depth:
+            state.transaction_depth += 1
+            try:
+                yield
+            finally:
+                state.transaction_depth -= 1
+            return
+
+        state.conn.execute("BEGIN IMMEDIATE")
+        state.transaction_depth = 1
+        try:
+            yield
+        except BaseException:
+            state.conn.rollback()
+            raise
+        else:
+            state.conn.commit()
+        finally:
+            state.transaction_depth = 0
     
     def _create_tables(self):
         """Create necessary tables if they don't exist"""
-        # Create projects table
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # Create classes table
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS classes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id),
-            UNIQUE (project_id, name)
-        )
-        ''')
-
-        # Create videos table (add project_id)
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS videos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            fps REAL NOT NULL,
-            frame_count INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id),
-            UNIQUE (project_id, name)
-        )
-        ''')
-        
-        # Create rectangles table (add class_id)
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS rectangles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            video_id INTEGER NOT NULL,
-            frame_index INTEGER NOT NULL,
-            class_id INTEGER NOT NULL,
-            x1 INTEGER NOT NULL,
-            y1 INTEGER NOT NULL,
-            x2 INTEGER NOT NULL,
-            y2 INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (video_id) REFERENCES videos (id),
-            FOREIGN KEY (class_id) REFERENCES classes (id),
-            UNIQUE (video_id, frame_index, class_id, x1, y1, x2, y2)
-        )
-        ''')
+        # Skip the DDL (and its commit) entirely when the file is already on the current schema
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        with self.transaction():
+            # Create projects table
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+
+            # Create classes table
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS classes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (project_id) REFERENCES projects (id),
+                UNIQUE (project_id, name)
+            )
+            ''')
+
+            # Create videos table (add project_id)
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS videos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                fps REAL NOT NULL,
+                frame_count INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (project_id) REFERENCES projects (id),
+                UNIQUE (project_id, name)
+            )
+            ''')
         
-        self.conn.commit()
+            # Create rectangles table (add class_id)
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rectangles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id INTEGER NOT NULL,
+                frame_index INTEGER NOT NULL,
+                class_id INTEGER NOT NULL,
+                x1 INTEGER NOT NULL,
+                y1 INTEGER NOT NULL,
+                x2 INTEGER NOT NULL,
+                y2 INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (video_id) REFERENCES videos (id),
+                FOREIGN KEY (class_id) REFERENCES classes (id),
+                UNIQUE (video_id, frame_index, class_id, x1, y1, x2, y2)
+            )
+            ''')
+
+            # Narrow index for the per-frame / per-video rectangle lookups; the seven-column
+            # UNIQUE index shares the prefix but is much wider to scan.
+            # (classes lookups by project_id already use the UNIQUE (project_id, name) index.)
+            self.cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rect_video_frame ON rectangles (video_id, frame_index)"
+            )
+
+            # Recorded in the same transaction, so a half-created schema is never marked current
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
 
     # --- Project Methods ---
     def create_project(self, name):
-        """Create a new project"""
+        """Create a new project, or return the existing project's ID if the name is taken"""
         try:
-            self.cursor.execute("INSERT INTO projects (name) VALUES (?)", (str(name),))
-            self.conn.commit()
-            return self.cursor.lastrowid
-        except sqlite3.IntegrityError:
+            # Returns no row for an existing name instead of raising. NOT EXISTS rather than
+            # ON CONFLICT, which would use up an AUTOINCREMENT value on every duplicate
+            self.cursor.execute(
+                """
+                INSERT INTO projects (name)
+                SELECT ?1 WHERE NOT EXISTS (SELECT 1 FROM projects WHERE name = ?1)
+                RETURNING id
+                """,
+                (str(name),)
+            )
+            result = self.cursor.fetchall()  # Step to completion so the insert is finished
+            if result:
+                return result[0][0]
+
             print(f"Project '{name}' already exists.")
             self.cursor.execute("SELECT id FROM projects WHERE name = ?", (str(name),))
             result = self.cursor.fetchone()
@@ -114,17 +257,21 @@ class Database:
 
     # --- Class Methods ---
     def create_class(self, project_id, name):
-        """Create a new class for a project"""
+        """Create a new class for a project, or return the existing class's ID"""
         try:
             self.cursor.execute(
-                "INSERT INTO classes (project_id, name) VALUES (?, ?)",
+                """
+                INSERT INTO classes (project_id, name)
+                SELECT ?1, ?2 WHERE NOT EXISTS (SELECT 1 FROM classes WHERE project_id = ?1 AND name = ?2)
+                RETURNING id
+                """,
                 (int(project_id), str(name))
             )
-            self.conn.commit()
-            return self.cursor.lastrowid
-        except sqlite3.IntegrityError:
+            result = self.cursor.fetchall()
+            if result:
+                return result[0][0]
+
             print(f"Class '{name}' already exists for project {project_id}.")
-            # Optionally return existing class ID if needed
             self.cursor.execute(
                 "SELECT id FROM classes WHERE project_id = ? AND name = ?",
                 (int(project_id), str(name))
@@ -151,43 +298,61 @@ class Database:
     def get_or_create_video(self, project_id, name, fps, frame_count):
         """Get a video by project and name, or create it if it doesn't exist"""
         try:
-            project_id_int = int(project_id)
-            name_str = str(name)
-            fps_float = float(fps)
-            frame_count_int = int(frame_count)
+            # Lookup and insert share one transaction so the check can't go stale
+            with self.transaction():
+                # Try to get the video
+                self.cursor.execute(_SQL_GET_VIDEO_ID, (project_id, name))
+                result = self.cursor.fetchone()
 
-            # Try to get the video
-            self.cursor.execute(
-                "SELECT id FROM videos WHERE project_id = ? AND name = ?",
-                (project_id_int, name_str)
-            )
-            result = self.cursor.fetchone()
-            
-            if result:
-                # Video exists, return its ID
-                return result[0]
-            else:
-                # Video doesn't exist, create it
-                self.cursor.execute(
-                    "INSERT INTO videos (project_id, name, fps, frame_count) VALUES (?, ?, ?, ?)",
-                    (project_id_int, name_str, fps_float, frame_count_int)
-                )
-                self.conn.commit()
-                return self.cursor.lastrowid
+                if result:
+                    # Video exists, return its ID
+                    return result[0]
+                else:
+                    # Video doesn't exist, create it
+                    self.cursor.execute(
+                        _SQL_INSERT_VIDEO,
+                        (project_id, name, fps, frame_count)
+                    )
+                    return self.cursor.lastrowid
         except sqlite3.Error as e:
             print(f"Database error in get_or_create_video: {e}")
             return None
-        except (ValueError, TypeError) as e:
-            print(f"Data type error in get_or_create_video: {e}")
-            return None
+
+    def get_or_create_videos(self, project_id, records):
+        """Get or create many videos of a project at once.
+
+        records is a list of (name, fps, frame_count) tuples. Returns a dict of name -> video ID.
+        """
+        if not records:
+            return {}
+        try:
+            # One insert pass and one lookup, committed together, instead of a round trip per video
+            with self.transaction():
+                # NOT EXISTS rather than ON CONFLICT: a conflicting insert still uses up an
+                # AUTOINCREMENT value, which would leave gaps in the IDs on every re-import
+                self.cursor.executemany(
+                    """
+                    INSERT INTO videos (project_id, name, fps, frame_count)
+                    SELECT ?1, ?2, ?3, ?4
+                    WHERE NOT EXISTS (SELECT 1 FROM videos WHERE project_id = ?1 AND name = ?2)
+                    """,
+                    ((project_id, name, fps, frame_count) for name, fps, frame_count in records)
+                )
+                names = list({record[0] for record in records})
+                placeholders = ", ".join("?" * len(names))
+                self.cursor.execute(
+                    f"SELECT name, id FROM videos WHERE project_id = ? AND name IN ({placeholders})",
+                    (project_id, *names)
+                )
+                return {row['name']: row['id'] for row in self.cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"Database error in get_or_create_videos: {e}")
+            return {}
 
     def get_video_id(self, project_id, name):
         """Get a video ID by project and name"""
         try:
-            self.cursor.execute(
-                "SELECT id FROM videos WHERE project_id = ? AND name = ?",
-                (int(project_id), str(name))
-            )
+            self.cursor.execute(_SQL_GET_VIDEO_ID, (project_id, name))
             result = self.cursor.fetchone()
             return result[0] if result else None
         except sqlite3.Error as e:
@@ -197,84 +362,56 @@ class Database:
     # --- Rectangle Methods (Updated) ---
     def save_rectangle(self, video_id, frame_index, class_id, x1, y1, x2, y2):
         """Save a rectangle to the database"""
+        return self.save_rectangles([(video_id, frame_index, class_id, x1, y1, x2, y2)])[0]
+
+    def save_rectangles(self, rows):
+        """Save many rectangles in one transaction.
+
+        rows is a sequence of (video_id, frame_index, class_id, x1, y1, x2, y2) tuples.
+        Returns a list with, for each row, whether it was inserted; rows that already
+        exist (UNIQUE constraint) are skipped and reported as False.
+        """
         try:
-            # Ensure parameters are of the correct type
-            video_id_int = int(video_id)
-            frame_index_int = int(frame_index)
-            class_id_int = int(class_id)
-            x1_int = int(x1)
-            y1_int = int(y1)
-            x2_int = int(x2)
-            y2_int = int(y2)
-            
-            # Try to insert the rectangle
-            self.cursor.execute(
-                """
-                INSERT INTO rectangles (video_id, frame_index, class_id, x1, y1, x2, y2)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (video_id_int, frame_index_int, class_id_int, x1_int, y1_int, x2_int, y2_int)
-            )
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            # Rectangle already exists (based on UNIQUE constraint)
-            print(f"Rectangle already exists for video {video_id}, frame {frame_index}, class {class_id}")
-            return False
+            with self.transaction():  # One commit (and fsync) for the whole batch
+                inserted = []
+                for row in rows:
+                    self._cursor_save_rect.execute(_SQL_INSERT_RECTANGLE, row)
+                    inserted.append(self._cursor_save_rect.rowcount == 1)
+            return inserted
         except sqlite3.Error as e:
-            print(f"Database error saving rectangle: {e}")
-            return False
-        except (ValueError, TypeError) as e:
-            print(f"Data type error saving rectangle: {e}")
-            return False
+            print(f"Database error saving rectangles: {e}")
+            return [False] * len(rows)
     
     def get_rectangles_for_frame(self, video_id, frame_index):
         """Get all rectangles (with class_id) for a specific frame of a video"""
         try:
-            video_id_int = int(video_id)
-            frame_index_int = int(frame_index)
-            
-            self.cursor.execute(
-                """
-                SELECT id, video_id, frame_index, class_id, x1, y1, x2, y2, created_at
-                FROM rectangles
-                WHERE video_id = ? AND frame_index = ?
-                """,
-                (video_id_int, frame_index_int)
-            )
-            return self.cursor.fetchall()
+            self._cursor_frame_rects.execute(_SQL_GET_RECTANGLES_FOR_FRAME, (video_id, frame_index))
+            return self._cursor_frame_rects.fetchall()
         except sqlite3.Error as e:
             print(f"Database error getting rectangles for frame: {e}")
             return []
-        except (ValueError, TypeError) as e:
-            print(f"Data type error getting rectangles for frame: {e}")
-            return []
     
-    def get_all_rectangles_for_video(self, video_id):
-        """Get all rectangles (with class_id) for a video"""
+    def get_rectangle_rows_for_video(self, video_id):
+        """Get a video's rectangles as an (N, 6) array of (frame_index, class_id, x1, y1, x2, y2) in frame order"""
         try:
-            video_id_int = int(video_id)
-            
-            self.cursor.execute(
-                """
-                SELECT id, frame_index, class_id, x1, y1, x2, y2, created_at
-                FROM rectangles
-                WHERE video_id = ?
-                ORDER BY frame_index
-                """,
-                (video_id_int,)
-            )
-            return self.cursor.fetchall()
+            cursor = self.conn.cursor()
+            cursor.row_factory = None  # Plain tuples: no per-row Row objects to build and unpack
+            cursor.execute(_SQL_GET_RECTANGLE_ROWS_FOR_VIDEO, (video_id,))
+            return np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 6)
         except sqlite3.Error as e:
-            print(f"Database error getting all rectangles for video: {e}")
-            return []
-        except (ValueError, TypeError) as e:
-            print(f"Data type error getting all rectangles for video: {e}")
-            return []
+            print(f"Database error getting rectangle rows for video: {e}")
+            return np.empty((0, 6), dtype=np.int64)
     
     def close(self):
-        """Close the database connection"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None 
\ No newline at end of file
+        """Close the database connections of all threads"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for index, state in enumerate(connections):
+            if index == 0:
+                try:
+                    # Let SQLite refresh query-planner statistics for the indexes before exiting
+                    state.conn.execute("PRAGMA optimize")
+                except sqlite3.Error as e:
+                    print(f"Database error optimizing on close: {e}")
+            state.conn.close()
+        self._local = threading.local()
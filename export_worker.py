@@ -0,0 +1,152 @@
+import io
+import os
+import queue
+import threading
+import av
+import cv2
+import numpy as np
+
+# Decoded frames waiting for a chunk's writer thread (bounds the memory they hold)
+WRITE_QUEUE_SIZE = 8
+# A target at most this many frames past the last decoded one is decoded to, not seeked to
+SCAN_AHEAD_FRAMES = 30
+
+def format_yolo_labels(rows, yolo_index_lookup, img_width, img_height):
+    """Format YOLO label files for (frame_index, class_id, x1, y1, x2, y2) rows in frame order.
+
+    Returns {frame_index: label file bytes} and the class_id of every box skipped
+    because its class isn't in the project.
+    """
+    frames = rows[:, 0]
+    class_ids = rows[:, 1]
+    in_range = class_ids < len(yolo_index_lookup)
+    yolo_index = np.full(len(rows), -1, dtype=np.int64)
+    yolo_index[in_range] = yolo_index_lookup[class_ids[in_range]]
+    known = yolo_index >= 0
+    x1, y1, x2, y2 = rows[known, 2:6].T.astype(np.float64)
+
+    # Normalized center x/y and width/height, clamped to the image
+    boxes = np.empty((len(x1), 4))
+    boxes[:, 0] = (x1 + x2) / 2 / img_width
+    boxes[:, 1] = (y1 + y2) / 2 / img_height
+    boxes[:, 2] = (x2 - x1) / img_width
+    boxes[:, 3] = (y2 - y1) / img_height
+    np.clip(boxes, 0.0, 1.0, out=boxes)
+
+    # One savetxt call for every box, then the lines are cut into per-frame runs
+    text = io.BytesIO()
+    np.savetxt(text, np.column_stack([yolo_index[known], boxes]), fmt='%d %.6f %.6f %.6f %.6f')
+    lines = text.getvalue().splitlines()
+    label_files = dict.fromkeys(np.unique(frames).tolist(), b"")  # Frames left with no known box
+    known_frames = frames[known]
+    starts = np.flatnonzero(np.diff(known_frames, prepend=-1))
+    ends = np.append(starts[1:], len(known_frames))
+    for frame_index, start, end in zip(known_frames[starts].tolist(), starts.tolist(), ends.tolist()):
+        label_files[frame_index] = b"\n".join(lines[start:end])
+    return label_files, class_ids[~known]
+
+def export_chunk(video_path, frame_duration, jobs, label_files, label_rows,
+                 yolo_index_lookup, label_size, image_format, jpeg_quality, image_size):
+    """Decode, encode and save a run of export frames with a container of its own.
+
+    jobs is a list of (frame_index, target_pts, img_path, lbl_path) in frame order. Runs in
+    a pool worker process (or in-process for small exports), so instead of printing it
+    returns the number of frames exported and a list of error messages (frames not exported
+    are the rest of jobs). Frames larger than image_size on their long side are scaled
+    down to it; None keeps the full resolution.
+    """
+    errors = []
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    write_errors = []  # Messages from the writer thread
+    writer = threading.Thread(
+        target=_write_frames, args=(write_queue, write_errors, image_format, jpeg_quality, image_size), daemon=True
+    )
+    writer.start()
+    queued_count = 0
+    container = None
+    try:
+        container = av.open(video_path)
+        stream = container.streams.video[0]
+        decoder = None
+        last_pts = None
+        for frame_index, target_pts, img_path, lbl_path in jobs:
+            try:
+                if decoder is None or not (last_pts < target_pts <= last_pts + SCAN_AHEAD_FRAMES * frame_duration):
+                    container.seek(target_pts, stream=stream, backward=True)
+                    decoder = container.decode(video=0)
+                # The first frame at or after the target; nothing past it is consumed
+                av_frame = next((frame for frame in decoder if frame.pts >= target_pts), None)
+                if av_frame is None:
+                    errors.append(f"  ERROR: Could not retrieve frame {frame_index}. Skipping.")
+                    decoder = None
+                    continue
+                last_pts = av_frame.pts
+
+                img_width, img_height = av_frame.width, av_frame.height
+                if img_width <= 0 or img_height <= 0:
+                    errors.append(f"  ERROR: Invalid dimensions for frame {frame_index} ({img_width}x{img_height}). Skipping.")
+                    continue
+
+                label_bytes = label_files[frame_index]
+                if (img_width, img_height) != label_size:
+                    # Frame size differs from the stream's; normalize this frame's boxes by its own
+                    frame_rows = label_rows[label_rows[:, 0] == frame_index]
+                    label_bytes = format_yolo_labels(frame_rows, yolo_index_lookup, img_width, img_height)[0][frame_index]
+
+                # Blocks while the writer is WRITE_QUEUE_SIZE frames behind
+                write_queue.put((frame_index, av_frame, img_path, lbl_path, label_bytes))
+                queued_count += 1
+            except Exception as e:
+                errors.append(f"  ERROR processing frame {frame_index}: {e}")
+                decoder = None  # Seek afresh for the next frame
+    except Exception as e:
+        errors.append(f"  ERROR opening video for export: {e}")
+    finally:
+        write_queue.put(None)  # Writer stops once everything before this is saved
+        writer.join()
+        if container is not None:
+            container.close()
+    errors.extend(write_errors)
+    return queued_count - len(write_errors), errors
+
+def _write_file(path, data):
+    """Write already-encoded bytes with raw os calls, skipping Python's buffered IO layer"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        view = memoryview(data).cast('B')
+        while view:
+            view = view[os.write(fd, view):]  # os.write may write less than asked
+    finally:
+        os.close(fd)
+
+def _scaled_size(width, height, image_size):
+    """Size that brings the long side down to image_size, keeping the aspect ratio"""
+    scale = image_size / max(width, height) if image_size else 1.0
+    if scale >= 1.0:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def _write_frames(write_queue, write_errors, image_format, jpeg_quality, image_size):
+    """Writer thread: convert and save queued frames and their labels until None"""
+    encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if image_format == ".jpg" else []
+    while True:
+        item = write_queue.get()
+        if item is None:
+            return
+        frame_index, av_frame, img_path, lbl_path, label_bytes = item
+        try:
+            # Downscaled by swscale before conversion. Labels are normalized, and no
+            # padding is added, so they stay valid at the new size.
+            width, height = _scaled_size(av_frame.width, av_frame.height, image_size)
+            if (width, height) != (av_frame.width, av_frame.height):
+                av_frame = av_frame.reformat(width=width, height=height, interpolation='AREA')
+            # Straight from the decoder's BGR ndarray for every format, no PIL image
+            # (and its RGB copy) in between
+            bgr = av_frame.to_ndarray(format='bgr24')
+            ok, encoded = cv2.imencode(image_format, bgr, encode_params)
+            if not ok:
+                raise ValueError(f"Could not encode {image_format} image")
+            _write_file(img_path, encoded)
+            _write_file(lbl_path, label_bytes)
+        except Exception as e:
+            write_errors.append(f"  ERROR processing frame {frame_index}: {e}")
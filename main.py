@@ -1,10 +1,13 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from video_model import VideoModel
-from video_view import VideoView
-from video_controller import VideoController
 
 def main():
+    # Imported here rather than at module level: spawned export and training processes
+    # re-import this file as __mp_main__, and they need none of the GUI
+    from PySide6.QtWidgets import QApplication
+    from video_model import VideoModel
+    from video_view import VideoView
+    from video_controller import VideoController
+
     # Create the application
     app = QApplication(sys.argv)
     
@@ -22,6 +25,8 @@ def main():
     # Clean up resources
     controller.cleanup()  # Clean up controller resources first
     model.cleanup()      # Then clean up model resources
+    model.shutdown()     # Write out pending rectangle saves and stop the DB thread
+    model.db.close()     # Finally close the database connection
     
     return exit_code
 
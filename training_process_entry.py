@@ -1,11 +1,126 @@
 import sys
 import os
-from multiprocessing import Process, Queue
-from ultralytics import YOLO
+from multiprocessing import Process, Queue, Value, Lock, Semaphore, shared_memory
 import logging
 import traceback
-import builtins
-import io
+import threading
+import time
+import queue
+import struct
+
+# Training input size; the export scales images down to it as well
+TRAINING_IMAGE_SIZE = 640
+
+class SharedLogRing:
+    """A byte ring buffer in shared memory that replaces a multiprocessing Queue for log text.
+
+    Each message is stored as a 4-byte length followed by its UTF-8 bytes, so sending one is an
+    encode and a copy instead of a pickle plus a pipe write. Provides the part of the Queue API
+    the log code uses: put, get, empty, get_nowait and close.
+
+    Writers only move head and the single reader only moves tail, so the lock serializes
+    writers alone. The reader never takes it: a training process killed mid-put can't leave
+    the GUI's reader (and LogReader.stop) waiting on a lock nobody will release.
+    """
+    HEADER = struct.Struct('<I')
+    PUT_TIMEOUT = 5.0  # Seconds a writer waits for room before dropping a message
+
+    def __init__(self, size=1 << 20):
+        self.size = size
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True  # Only the creating process unlinks the block
+        self._head = Value('Q', 0, lock=False)  # Total bytes ever written
+        self._tail = Value('Q', 0, lock=False)  # Total bytes ever read
+        self._lock = Lock()  # Between writers only
+        self._available = Semaphore(0)  # One count per stored message (plus any wake() calls)
+
+    def __getstate__(self):
+        # Sent to the training process by name and re-attached there
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        state['_owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state['_shm'])
+
+    def put(self, text):
+        data = text.encode('utf-8', 'replace')[:self.size - self.HEADER.size]
+        record = self.HEADER.pack(len(data)) + data
+        deadline = time.monotonic() + self.PUT_TIMEOUT
+        while True:
+            # Bounded, like the wait for room: a writer that died holding the lock drops messages, not training
+            if not self._lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                return
+            try:
+                head = self._head.value
+                if self.size - (head - self._tail.value) >= len(record):
+                    self._copy_in(head, record)
+                    self._head.value = head + len(record)  # Publish only once the bytes are in place
+                    self._available.release()
+                    return
+            finally:
+                self._lock.release()
+            if time.monotonic() >= deadline:
+                return  # Nobody is draining the ring; drop the message rather than stall training
+            time.sleep(0.01)
+
+    def empty(self):
+        return self._head.value == self._tail.value
+
+    def get(self, timeout=None):
+        """Block until a message arrives; returns None if woken by wake() with nothing stored"""
+        if not self._available.acquire(timeout=timeout):
+            raise queue.Empty
+        return self._pop()
+
+    def wake(self):
+        """Release one blocked get() even though nothing was put"""
+        self._available.release()
+
+    def get_nowait(self):
+        if not self._available.acquire(block=False):
+            raise queue.Empty
+        message = self._pop()
+        if message is None:
+            raise queue.Empty
+        return message
+
+    def _pop(self):
+        """Take the oldest message off the ring, or None if it is empty (single reader, no lock)"""
+        tail = self._tail.value
+        if tail == self._head.value:  # Everything below head is fully written
+            return None
+        (length,) = self.HEADER.unpack(self._copy_out(tail, self.HEADER.size))
+        data = self._copy_out(tail + self.HEADER.size, length)
+        self._tail.value = tail + self.HEADER.size + length  # Frees the space for writers
+        return data.decode('utf-8', 'replace')
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def _copy_in(self, pos, data):
+        """Copy bytes into the ring at stream position pos, wrapping around the end"""
+        start = pos % self.size
+        first = min(len(data), self.size - start)
+        self._shm.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self._shm.buf[:len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, length):
+        """Read length bytes from stream position pos, wrapping around the end"""
+        start = pos % self.size
+        first = min(length, self.size - start)
+        data = bytes(self._shm.buf[start:start + first])
+        if first < length:
+            data += bytes(self._shm.buf[:length - first])
+        return data
 
 class QueueHandler(logging.Handler):
     """A logging handler that sends log records to a multiprocessing Queue."""
@@ -22,41 +137,49 @@ class QueueHandler(logging.Handler):
             self.handleError(record)
 
 class QueueLogStream:
-    """A stream-like object that writes to a multiprocessing Queue."""
+    """A stream-like object that writes to a multiprocessing Queue.
+
+    Writes are buffered and sent once per line (or once the buffer gets large), since
+    progress bars write a few characters at a time and every put pickles and crosses a pipe.
+    """
+    FLUSH_SIZE = 4096      # Send once this many characters are buffered
+    FLUSH_INTERVAL = 0.2   # Seconds before a partial line (e.g. a progress bar) is sent anyway
+
     def __init__(self, queue):
         self.queue = queue
-        self.buffer = ''
+        self.buffer = []
+        self.buffer_size = 0
+        self._lock = threading.Lock()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
 
     def write(self, text):
-        if text:  # Send all text, not just lines
-            self.queue.put(text)
+        if text:
+            with self._lock:
+                self.buffer.append(text)
+                self.buffer_size += len(text)
+                if '\n' in text or self.buffer_size >= self.FLUSH_SIZE:
+                    self._flush_buffer()
+        return len(text)
 
     def flush(self):
-        pass
-
-    def isatty(self):
-        return False
+        with self._lock:
+            self._flush_buffer()
 
-class PrintCapture:
-    """Captures all print statements."""
-    def __init__(self, queue):
-        self.original_print = builtins.print
-        self.queue = queue
+    def _flush_buffer(self):
+        """Send everything buffered as one queue item (caller holds the lock)"""
+        if self.buffer:
+            self.queue.put(''.join(self.buffer))
+            self.buffer = []
+            self.buffer_size = 0
 
-    def custom_print(self, *args, **kwargs):
-        # Capture the output that would have gone to print
-        output = io.StringIO()
-        kwargs['file'] = output
-        self.original_print(*args, **kwargs)
-        self.queue.put(output.getvalue())
-        # Also send to original stdout for safety
-        self.original_print(*args, **kwargs)
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            self.flush()
 
-    def __enter__(self):
-        builtins.print = self.custom_print
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        builtins.print = self.original_print
+    def isatty(self):
+        return False
 
 def setup_logging(queue):
     """Set up logging capture for essential output only."""
@@ -100,28 +223,41 @@ def run_training_entry_point(data_yaml_path, project_name, log_queue):
         # Set up comprehensive logging
         queue_handler = setup_logging(log_queue)
         
-        # Capture print statements
-        with PrintCapture(log_queue):
-            # Log some initial information
-            log_queue.put(f"Starting training process for project: {project_name}\n")
-            log_queue.put(f"Using data file: {data_yaml_path}\n")
-            
-            # Initialize YOLO model
-            model = YOLO('yolov8n.pt')
-            
-            # Start training
-            model.train(
-                data=data_yaml_path,
-                project=os.path.join('runs', project_name),
-                epochs=100,
-                imgsz=640,
-                batch=16,
-                workers=4,
-                device='0',  # Use GPU if available Ensure all output is shown
-            )
-            
-            # Signal successful completion
-            log_queue.put("TRAINING_COMPLETE\n")
+        # print() needs no patching: setup_logging already pointed sys.stdout at the queue
+
+        # Log some initial information
+        log_queue.put(f"Starting training process for project: {project_name}\n")
+        log_queue.put(f"Using data file: {data_yaml_path}\n")
+
+        # Imported only here, in the training process: the GUI and the spawned export
+        # workers import this module too and have no use for torch
+        import torch
+        from ultralytics import YOLO
+        
+        # Input size is fixed, so let cuDNN benchmark and keep its fastest conv kernels,
+        # and allow TF32 for the remaining float32 matmuls
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision('high')
+
+        # Initialize YOLO model
+        model = YOLO('yolov8n.pt')
+        
+        # Start training
+        model.train(
+            data=data_yaml_path,
+            project=os.path.join('runs', project_name),
+            epochs=100,
+            imgsz=TRAINING_IMAGE_SIZE,
+            batch=16,
+            workers=4,
+            device='0',  # Use GPU if available Ensure all output is shown
+            amp=True,  # Mixed precision on Tensor Cores; ultralytics falls back if its AMP check fails
+            cache='ram',  # Decode the exported images once instead of every epoch
+        )
+        
+        # Signal successful completion (after any buffered output, so nothing trails it)
+        sys.stdout.flush()
+        log_queue.put("TRAINING_COMPLETE\n")
 
     except Exception as e:
         # Send error information to the main process
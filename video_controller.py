@@ -1,20 +1,23 @@
-from PySide6.QtCore import QTimer, Qt, QObject, Signal
-import time
+from PySide6.QtCore import QTimer, QElapsedTimer, QThread, Qt, QObject, Signal
 import os
+import math
 import random
-from collections import defaultdict
-from PIL import Image
+import numpy as np
 import yaml
 import threading
-from ultralytics import YOLO
-from ultralytics import settings
+import queue
 import traceback
 import io
 import logging
 import contextlib
 import sys
-from multiprocessing import Process, Queue
-from training_process_entry import run_training_entry_point
+import multiprocessing
+from multiprocessing import Process
+from training_process_entry import run_training_entry_point, SharedLogRing, TRAINING_IMAGE_SIZE
+from export_worker import export_chunk, format_yolo_labels
+
+# libyaml's C dumper when PyYAML was built with it, otherwise the pure-Python one
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
 
 # --- Helper Class to Redirect Stdout/Stderr --- 
 class GUILogStream(QObject):
@@ -39,67 +42,165 @@ class GUILogStream(QObject):
     def isatty(self):
         return False
 
+# --- Training Log Reader ---
+class LogReader(QThread):
+    """Waits on the training log ring and hands messages to the GUI thread in batches"""
+    messages = Signal(list)
+    MAX_BATCH = 256  # Most messages handed over at once
+
+    def __init__(self, log_queue):
+        super().__init__()
+        self.log_queue = log_queue
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                # Blocks until a message is put; the timeout only bounds how long a stop
+                # request can go unnoticed if the training process died mid-put
+                message = self.log_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if message is None:  # Woken by stop()
+                break
+            # Take whatever else is already waiting, so a burst of output (e.g. a progress
+            # bar) becomes one signal and one text append instead of hundreds
+            batch = [message]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self.log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.messages.emit(batch)
+
+    def stop(self):
+        """Stop and wait for the thread, after which the ring can be closed"""
+        self.requestInterruption()
+        self.log_queue.wake()
+        self.wait()
+
 # --- Video Controller --- 
 class VideoController:
+    # Navigation repeated faster than this (key autorepeat) is collapsed to its latest target
+    NAV_COALESCE_MS = 40
+    # Export runs in-process below this many frames per extra worker process
+    EXPORT_FRAMES_PER_WORKER = 200
+    # Exported image format: ".jpg" (quality 95) is a fraction of the size of a BMP;
+    # ".png" is lossless, ".bmp" (with EXPORT_IMAGE_SIZE = None) reproduces the old output's pixels exactly
+    EXPORT_IMAGE_FORMAT = ".jpg"
+    EXPORT_JPEG_QUALITY = 95
+    # Long side of exported images, matching the training imgsz, so training doesn't resize
+    # the full-resolution frames again every epoch; None exports them at full resolution
+    EXPORT_IMAGE_SIZE = TRAINING_IMAGE_SIZE
+    # Most frames advanced in one tick when playback fell behind (e.g. the GUI thread was busy)
+    MAX_CATCH_UP_FRAMES = 4
+    # While playing, the frame counter and slider are redrawn at most this often (~10 Hz)
+    POSITION_UPDATE_INTERVAL_MS = 100
+
     def __init__(self, model, view):
         self.model = model
         self.view = view
+        # Single-shot timer re-armed for every frame deadline (see _schedule_next_frame)
         self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self._on_timer_timeout)
-        self.last_frame_time = 0
+        self.playback_clock = QElapsedTimer()  # Monotonic base that frame deadlines are measured from
+        self.frame_rate = 0.0  # Cached from the model's fps_changed signal
+        self.speed_multiplier = view.get_speed_multiplier()  # Cached from the speed dropdown's signal
+        self.frame_interval_ms = 0.0
+        self.refresh_interval_ms = 0.0  # Display refresh period that frame deadlines are snapped to
+        self.frames_played = 0  # Frames advanced since playback_clock was started
+        self._labeled_frames = set()  # Frames shown in the labeled frames list
+        self._shown_position = None  # (frame_index, frame_count) last shown by the counter and slider
+        self._position_clock = QElapsedTimer()  # Time since the counter and slider were last updated
+        # Slider drags are coalesced: at most one seek per display refresh, to the latest position
+        self._seek_pending = None
+        self._seek_timer = QTimer()
+        self._seek_timer.setSingleShot(True)
+        self._seek_timer.timeout.connect(self._apply_pending_seek)
+        # Button/key navigation seeks at once, then at most once per NAV_COALESCE_MS while repeating
+        self._pending_nav_target = None
+        self._nav_coalesce = QTimer()
+        self._nav_coalesce.setSingleShot(True)
+        self._nav_coalesce.setInterval(self.NAV_COALESCE_MS)
+        self._nav_coalesce.timeout.connect(self._apply_pending_nav)
         self.is_training = False # Flag to track training state
         self.log_stream = None # Placeholder for the stream instance
         self.training_process = None
         self.log_queue = None
-        self.log_timer = QTimer()
-        self.log_timer.timeout.connect(self._process_log_queue)
+        self.log_reader = None  # LogReader for the running training process
         
-        # --- Connect View Signals ---
-        # Project/Class signals
-        self.view.project_dropdown.currentIndexChanged.connect(self._on_project_selected)
-        self.view.add_project_button.clicked.connect(self._add_project)
-        self.view.add_current_class_button.clicked.connect(self._add_class)
-        # Open video button (now project-aware)
-        self.view.open_button.clicked.connect(self.open_video)
-        
-        # Labeled Frames List
-        self.view.labeled_frames_list.itemClicked.connect(self._on_frame_list_item_clicked)
-        # New List Navigation Signals
-        self.view.navigate_labeled_up.connect(self._navigate_labeled_list_up)
-        self.view.navigate_labeled_down.connect(self._navigate_labeled_list_down)
-        
-        # Export Button
-        self.view.export_button.clicked.connect(self._export_dataset)
-        # Train Button
-        self.view.train_button.clicked.connect(self._start_training)
-        # Stop Button (now from log dialog)
-        self.view.training_log_dialog.stop_button.clicked.connect(self.stop_training)
-
-        # Video control signals
-        self.view.play_button.clicked.connect(self.toggle_playback)
-        self.view.prev_frame.clicked.connect(lambda: self.model.seek(self.model.current_frame_index - 1))
-        self.view.next_frame.clicked.connect(self.model.advance_frame)
-        # Connect +/- 10 frame buttons
-        self.view.prev_10_frames.clicked.connect(lambda: self.model.seek(self.model.current_frame_index - 10))
-        self.view.next_10_frames.clicked.connect(lambda: self.model.seek(self.model.current_frame_index + 10))
-        self.view.seek_slider.sliderMoved.connect(self._on_slider_moved)
-        self.view.seek_slider.sliderReleased.connect(self._on_slider_released)
-        self.view.speed_dropdown.currentIndexChanged.connect(self._on_speed_changed)
-        
-        # Rectangle drawing signal
-        self.view.video_display.rectangle_drawn.connect(self._on_rectangle_drawn)
-
-        # --- Connect Model Signals ---
-        self.model.frame_changed.connect(self.view.display_frame)
-        self.model.frame_count_changed.connect(self._on_frame_count_changed)
-        self.model.current_frame_index_changed.connect(self._on_current_frame_changed)
-        self.model.playback_state_changed.connect(self._on_playback_state_changed)
-        self.model.fps_changed.connect(self.view.update_fps)
-        self.model.rectangles_changed.connect(self._on_rectangles_changed) # Updated connection
+        # --- Signal Wiring ---
+        # (signal, slot) pairs, wired in one loop by _connect_signals and undone by cleanup
+        view = self.view
+        model = self.model
+        self._connections = [
+            # Project/Class signals
+            (view.project_dropdown.currentIndexChanged, self._on_project_selected),
+            (view.add_project_button.clicked, self._add_project),
+            (view.add_current_class_button.clicked, self._add_class),
+            # Open video button (now project-aware)
+            (view.open_button.clicked, self.open_video),
+            # Labeled Frames List
+            (view.labeled_frames_list.clicked, self._on_frame_list_item_clicked),
+            # New List Navigation Signals
+            (view.navigate_labeled_up, self._navigate_labeled_list_up),
+            (view.navigate_labeled_down, self._navigate_labeled_list_down),
+            # Export Button
+            (view.export_button.clicked, self._export_dataset),
+            # Train Button
+            (view.train_button.clicked, self._start_training),
+            # Stop Button (now from log dialog)
+            (view.stop_training_requested, self.stop_training),
+            # Video control signals
+            (view.play_button.clicked, self.toggle_playback),
+            (view.prev_frame.clicked, self._seek_prev_1),
+            (view.next_frame.clicked, model.advance_frame),
+            # +/- 10 frame buttons
+            (view.prev_10_frames.clicked, self._seek_prev_10),
+            (view.next_10_frames.clicked, self._seek_next_10),
+            (view.seek_slider.sliderMoved, self._on_slider_moved),
+            (view.seek_slider.sliderReleased, self._on_slider_released),
+            (view.speed_dropdown.currentIndexChanged, self._on_speed_changed),
+            # Rectangle drawing signal
+            (view.video_display.rectangle_drawn, self._on_rectangle_drawn),
+            # Model signals
+            (model.frame_changed, view.display_frame),
+            (model.frame_count_changed, self._on_frame_count_changed),
+            (model.current_frame_index_changed, self._on_current_frame_changed),
+            (model.playback_state_changed, self._on_playback_state_changed),
+            (model.fps_changed, view.update_fps),
+            (model.fps_changed, self._on_fps_changed),
+            (model.rectangles_changed, self._on_rectangles_changed),
+        ]
+        self._signals_connected = False
+        self._connect_signals()
 
         # --- Initial Population ---
         self._populate_projects()
     
+    def _connect_signals(self):
+        """Wire every view/model signal to its slot, once.
+
+        All of them are GUI thread to GUI thread, so the connections are direct and skip
+        the per-emit thread-affinity check (only the model's workers cross threads).
+        Qt.UniqueConnection can't guard against double wiring here: PySide only supports
+        it for slots on QObjects, so a flag does that instead.
+        """
+        if self._signals_connected:
+            return
+        for signal, slot in self._connections:
+            signal.connect(slot, Qt.DirectConnection)
+        self._signals_connected = True
+
+    def _disconnect_signals(self):
+        """Undo _connect_signals, so nothing reaches the controller after teardown"""
+        if not self._signals_connected:
+            return
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+        self._signals_connected = False
+
     # --- Project and Class Handling ---
     def _populate_projects(self):
         """Load projects from DB and populate dropdown"""
@@ -181,19 +282,21 @@ class VideoController:
         """Update the list of frames containing rectangles"""
         if self.model.video_id is not None:
             frame_numbers = self.model.get_frames_with_rectangles()
+            self._labeled_frames = set(frame_numbers)
             self.view.populate_labeled_frames_list(frame_numbers)
         else:
+            self._labeled_frames = set()
             self.view.clear_labeled_frames_list()
 
-    def _on_frame_list_item_clicked(self, item):
+    def _on_frame_list_item_clicked(self, index):
         """Handle clicks on the labeled frames list"""
-        try:
-            frame_number = item.data(Qt.UserRole) # Get frame number from item data
-            
-            if frame_number is not None and self.model.video_id is not None:
-                self.model.seek(frame_number)
-        except Exception as e:
-            print(f"  Error in _on_frame_list_item_clicked: {e}") # DEBUG
+        self._seek_to_labeled_item(index)
+
+    def _seek_to_labeled_item(self, index):
+        """Seek to the frame shown at a labeled frames list index"""
+        frame_number = index.data(Qt.UserRole) # Get frame number from the model index
+        if frame_number is not None and self.model.video_id is not None:
+            self._navigate_to(frame_number)
 
     def _navigate_labeled_list(self, direction):
         """Navigate the labeled list up or down and seek to the selected frame."""
@@ -219,7 +322,7 @@ class VideoController:
         
         # Seek to the frame corresponding to the new item
         if new_item:
-            self._on_frame_list_item_clicked(new_item) # Reuse click logic to seek
+            self._seek_to_labeled_item(new_item)
 
     def _navigate_labeled_list_up(self):
         self._navigate_labeled_list("up")
@@ -228,29 +331,87 @@ class VideoController:
         self._navigate_labeled_list("down")
 
     # --- Playback and Navigation (Mostly Unchanged) ---
+    # Bound methods rather than lambdas, so button clicks call straight into the slot
+    def _seek_prev_1(self):
+        self._navigate_to(self._nav_position() - 1)
+
+    def _seek_prev_10(self):
+        self._navigate_to(self._nav_position() - 10)
+
+    def _seek_next_10(self):
+        self._navigate_to(self._nav_position() + 10)
+
+    def _nav_position(self):
+        """Frame relative navigation starts from: the pending target while a burst is coalesced"""
+        if self._pending_nav_target is not None:
+            return self._pending_nav_target
+        return self.model.current_frame_index
+
+    def _navigate_to(self, frame_index):
+        """Seek for a navigation button or key, coalescing autorepeat into the latest target"""
+        frame_index = max(0, min(frame_index, self.model.frame_count - 1))
+        if self._nav_coalesce.isActive():
+            # Still inside the last seek's window: only the newest target of the burst is decoded
+            self._pending_nav_target = frame_index
+            return
+        self.model.seek(frame_index)
+        self._nav_coalesce.start()
+
+    def _apply_pending_nav(self):
+        """Seek to the last target requested while the coalescing window was open"""
+        frame_index = self._pending_nav_target
+        self._pending_nav_target = None
+        if frame_index is not None and self.model.video_id is not None:
+            self.model.seek(frame_index)
+            self._nav_coalesce.start()  # A held key keeps being throttled
+
     def toggle_playback(self):
         """Handle play/pause button click"""
         # Check if a video is loaded
         if self.model.video_id is None:
              self.view.show_error_message("Info", "Please open a video first.")
              return 
-        is_playing = self.model.toggle_playback()
-        if is_playing:
-            self._start_playback_timer()
-        else:
-            self.timer.stop()
+        # The timer follows playback_state_changed (see _on_playback_state_changed)
+        self.model.toggle_playback()
     
     def _start_playback_timer(self):
         """Start the playback timer with the current speed"""
-        frame_rate = self.model.get_frame_rate()
+        frame_rate = self.frame_rate
         if frame_rate > 0:
-            speed = self.view.get_speed_multiplier()
-            interval = int(1000 / (frame_rate * speed))
-            self.timer.start(interval)
-            self.last_frame_time = time.time()
+            self.frame_interval_ms = 1000.0 / (frame_rate * self.speed_multiplier)
+            screen = self.view.screen()
+            refresh_rate = screen.refreshRate() if screen else 0
+            self.refresh_interval_ms = 1000.0 / refresh_rate if refresh_rate > 0 else 0.0
+            # Restart the deadline base; frame N is due at N * frame_interval_ms from here
+            self.playback_clock.start()
+            self.frames_played = 0
+            self._schedule_next_frame()
+
+    def _schedule_next_frame(self):
+        """Arm the timer for the next frame's deadline.
+
+        Deadlines are computed from the playback start rather than the previous tick,
+        so millisecond rounding and late wake-ups never accumulate into drift. Each one
+        is also rounded up to the display's refresh grid, so frames always land at the
+        same point in the refresh cycle (a steady 2:2 or 3:2 cadence) instead of at a
+        random phase that shows up as judder.
+        """
+        next_deadline = (self.frames_played + 1) * self.frame_interval_ms
+        if self.refresh_interval_ms:
+            # The small tolerance keeps float error from pushing an exact multiple to the next slot
+            slots = math.ceil(next_deadline / self.refresh_interval_ms - 1e-6)
+            next_deadline = slots * self.refresh_interval_ms
+        # Nanosecond clock and a rounded-up wait, so a frame is never shown before its deadline
+        elapsed_ms = self.playback_clock.nsecsElapsed() / 1e6
+        self.timer.start(max(0, math.ceil(next_deadline - elapsed_ms)))
     
+    def _on_fps_changed(self, fps):
+        """Cache the frame rate of the loaded video"""
+        self.frame_rate = fps
+
     def _on_speed_changed(self, index):
         """Handle speed dropdown changes"""
+        self.speed_multiplier = self.view.get_speed_multiplier()
         if self.model.is_playing:
             self._start_playback_timer()
     
@@ -260,23 +421,21 @@ class VideoController:
         if self.model.video_id is None or not self.model.is_playing:
             self.timer.stop()
             return
-            
-        current_time = time.time()
-        speed = self.view.get_speed_multiplier()
-        try:
-            frame_rate = self.model.get_frame_rate()
-            if frame_rate <= 0:
-                 self.timer.stop()
-                 return
-            frame_duration = 1.0 / (frame_rate * speed)
-        except ZeroDivisionError:
-            self.timer.stop() # Stop timer if frame rate is invalid
+
+        # Advance every frame whose deadline has passed, so a late tick catches up
+        frames_due = int(self.playback_clock.nsecsElapsed() / 1e6 / self.frame_interval_ms)
+        behind = max(1, frames_due - self.frames_played)
+        # Frames passed over on the way are decoded but never converted or shown
+        advance = min(behind, self.MAX_CATCH_UP_FRAMES)
+        self.model.advance_frames(advance)
+        self.frames_played += advance
+        # advance_frames stops playback when it runs off the end of the video
+        if not self.model.is_playing:
             return
-        
-        # Check if it's time for the next frame
-        if current_time - self.last_frame_time >= frame_duration:
-            self.model.advance_frame()
-            self.last_frame_time = current_time
+        if behind > self.MAX_CATCH_UP_FRAMES:
+            # Too far behind to catch up: drop the backlog instead of racing through it
+            self.frames_played = frames_due
+        self._schedule_next_frame()
     
     def _on_frame_count_changed(self, frame_count):
         """Handle frame count changes"""
@@ -284,50 +443,97 @@ class VideoController:
     
     def _on_current_frame_changed(self, frame_index):
         """Handle current frame index changes"""
+        position = (frame_index, self.model.frame_count)
+        if position == self._shown_position:
+            return  # Re-emitted for the same frame; the label and slider already show it
+        if (self.model.is_playing and self._position_clock.isValid()
+                and self._position_clock.elapsed() < self.POSITION_UPDATE_INTERVAL_MS):
+            return  # Nobody reads a counter ticking at the frame rate; pausing shows the final frame
+        self._position_clock.start()
+        self._shown_position = position
+        # update_seek_slider blocks the slider's signals, so this never feeds back into a seek
         self.view.update_frame_counter(frame_index, self.model.frame_count)
         self.view.update_seek_slider(frame_index, self.model.frame_count)
     
     def _on_playback_state_changed(self, is_playing):
         """Handle playback state changes"""
         self.view.update_play_button(is_playing)
+        # The one place the playback timer is started or stopped, whatever changed the state
         if not is_playing:
             self.timer.stop()
+            # Catch the counter and slider up on frames skipped while playing
+            self._on_current_frame_changed(self.model.current_frame_index)
+        elif not self.timer.isActive():
+            self._start_playback_timer()
     
     def _on_slider_moved(self, value):
         """Handle slider movement (dragging)"""
         if self.model.video_id is not None:
+            self._seek_pending = value
+            # Not restarted while armed, so a continuous drag still seeks every 16 ms
+            if not self._seek_timer.isActive():
+                self._seek_timer.start(16)
+
+    def _apply_pending_seek(self):
+        """Seek to the most recent slider position seen during the drag"""
+        value = self._seek_pending
+        self._seek_pending = None
+        if value is not None and self.model.video_id is not None:
             self.model.seek(value)
     
     def _on_slider_released(self):
         """Handle slider release (clicking)"""
+        # The release position supersedes any drag seek still waiting
+        self._seek_timer.stop()
+        self._seek_pending = None
         if self.model.video_id is not None:
             value = self.view.seek_slider.value()
-            self.model.seek(value)
+            # After a drag the model is usually already on this frame; don't decode it twice
+            if value != self.model.current_frame_index:
+                self.model.seek(value)
         
     # --- Rectangle Handling ---
     def _on_rectangle_drawn(self, x1, y1, x2, y2):
         """Handle rectangle drawn signal from the view"""
-        class_id = self.view.get_selected_class_id()
+        # Look model/view up once; this runs for every rectangle while labelling
+        model = self.model
+        view = self.view
+        class_id = view.get_selected_class_id()
         if class_id is None or class_id == -1:
-             self.view.show_error_message("Error", "Please select a class before drawing a rectangle.")
+             view.show_error_message("Error", "Please select a class before drawing a rectangle.")
              return
-        if self.model.video_id is None:
-            self.view.show_error_message("Error", "Please open a video first.")
+        if model.video_id is None:
+            view.show_error_message("Error", "Please open a video first.")
             return
             
         # Add the rectangle to the model (which also saves to DB)
-        self.model.add_rectangle(class_id, x1, y1, x2, y2)
-        # Update the list of labeled frames potentially
-        self._update_labeled_frames_list() 
+        frame_index = model.current_frame_index
+        model.add_rectangle(class_id, x1, y1, x2, y2)
+        # Only a frame's first rectangle changes the labeled list, and then by one row,
+        # so insert it in place instead of rebuilding the whole list
+        labeled_frames = self._labeled_frames
+        if frame_index not in labeled_frames:
+            labeled_frames.add(frame_index)
+            view.insert_labeled_frame(frame_index)
+
+    def add_rectangles_bulk(self, items):
+        """Add many (frame_index, class_id, x1, y1, x2, y2) rectangles and list their new frames"""
+        if self.model.video_id is None:
+            self.view.show_error_message("Error", "Please open a video first.")
+            return
+        labeled_frames = self._labeled_frames
+        for frame_index in self.model.add_rectangles_bulk(items):
+            if frame_index not in labeled_frames:
+                labeled_frames.add(frame_index)
+                self.view.insert_labeled_frame(frame_index)
 
     def _on_rectangles_changed(self, rectangles_data):
          """Handle the signal from the model when rectangles for the current frame change."""
-         # rectangles_data is a list of tuples: [(class_id, x1, y1, x2, y2), ...]
+         # rectangles_data is an (N, 5) array: rows of (class_id, x1, y1, x2, y2)
          # We need to potentially map class_id back to class name or color for display if needed.
-         # For now, just pass the geometric data to set_rectangles.
+         # For now, just pass the geometric data to set_rectangles (a view, nothing is copied).
          # TODO: Enhance VideoDisplay to handle class information (e.g., different colors)
-         rects_for_display = [(r[1], r[2], r[3], r[4]) for r in rectangles_data]
-         self.view.video_display.set_rectangles(rects_for_display)
+         self.view.video_display.set_rectangles(rectangles_data[:, 1:5])
          # Update the labeled frames list as rectangles might have changed
          # Optimization: Could check if the *set* of labeled frames actually changed
          # self._update_labeled_frames_list() # This is called after add_rectangle now 
@@ -361,24 +567,35 @@ class VideoController:
             return
         # Create map: DB class_id -> 0-based yolo_index
         class_id_to_yolo_index = {row['id']: index for index, row in enumerate(classes)}
+        # The same map as an array indexed by class_id (-1 for ids not in this project)
+        yolo_index_lookup = np.full(max(class_id_to_yolo_index) + 1, -1, dtype=np.int64)
+        yolo_index_lookup[list(class_id_to_yolo_index)] = list(class_id_to_yolo_index.values())
         # Create ordered list of class names for YAML
         class_names_ordered = [row['name'] for row in classes] # Ensure order matches yolo index
         print(f"  Class mapping: {class_id_to_yolo_index}")
         print(f"  Class names: {class_names_ordered}")
 
         # --- Get Rectangle Data --- 
-        all_rectangles = self.model.db.get_all_rectangles_for_video(video_id)
-        if not all_rectangles:
+        self.model.flush_pending_saves()  # Include rectangles whose save is still queued
+        # Rows of (frame_index, class_id, x1, y1, x2, y2), in frame order
+        label_rows = self.model.db.get_rectangle_rows_for_video(video_id)
+        if not len(label_rows):
             self.view.show_error_message("Export Error", "No rectangles found for this video.")
             return
             
-        rects_by_frame = defaultdict(list)
-        for rect in all_rectangles:
-            rects_by_frame[rect['frame_index']].append(rect)
-            
-        labeled_frame_indices = sorted(list(rects_by_frame.keys()))
+        labeled_frame_indices = np.unique(label_rows[:, 0]).tolist()
         print(f"  Found {len(labeled_frame_indices)} frames with labels.")
 
+        # --- Build Labels --- 
+        # Labels don't need any pixels, so every file's contents are formatted here in one pass
+        # and the writer only has to put the bytes on disk
+        label_width = self.model.stream.codec_context.width
+        label_height = self.model.stream.codec_context.height
+        label_files, unknown_class_ids = format_yolo_labels(label_rows, yolo_index_lookup, label_width, label_height)
+        # One warning per missing class rather than one per box
+        for class_id, box_count in zip(*(a.tolist() for a in np.unique(unknown_class_ids, return_counts=True))):
+            print(f"  WARNING: Class ID {class_id} not found in project map. Skipping its {box_count} box(es).")
+
         # --- Prepare Directories --- 
         base_export_dir = os.path.abspath(os.path.join("datasets", project_name))
         train_img_dir = os.path.join(base_export_dir, "train", "images")
@@ -416,7 +633,8 @@ class VideoController:
             print(f"  Attempting to write data.yaml to: {yaml_path}") # DEBUG
             print(f"  YAML content: {yaml_data}") # DEBUG
             with open(yaml_path, 'w') as f:
-                yaml.dump(yaml_data, f, default_flow_style=False, sort_keys=False)
+                # Dumped to one string and written at once, with libyaml's dumper when it's built in
+                f.write(yaml.dump(yaml_data, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False))
             print(f"  Successfully created data.yaml") # DEBUG
         except Exception as e:
             print(f"  ERROR writing data.yaml: {e}") # DEBUG
@@ -428,73 +646,56 @@ class VideoController:
         split_index = int(len(labeled_frame_indices) * 0.8)
         train_indices = labeled_frame_indices[:split_index]
         valid_indices = labeled_frame_indices[split_index:]
+        train_set = set(train_indices)
         print(f"  Splitting into {len(train_indices)} train, {len(valid_indices)} valid frames.")
 
         # --- Process and Save Frames/Labels --- 
         export_count = 0
-        error_count = 0
         video_name_base = os.path.splitext(video_name)[0]
 
-        for frame_index in train_indices + valid_indices:
-            is_train = frame_index in train_indices
+        # The shuffle only picks the split; frames are exported in video order, in contiguous
+        # runs, so each worker mostly decodes on instead of seeking for every frame
+        jobs = []
+        for frame_index in sorted(labeled_frame_indices):
+            is_train = frame_index in train_set
             img_dir = train_img_dir if is_train else valid_img_dir
             lbl_dir = train_lbl_dir if is_train else valid_lbl_dir
-            
-            av_frame = self.model.get_frame_by_index(frame_index)
-            if av_frame is None:
-                print(f"  ERROR: Could not retrieve frame {frame_index}. Skipping.")
-                error_count += 1
-                continue
+            img_filename = f"{video_name_base}_frame_{frame_index}{self.EXPORT_IMAGE_FORMAT}"
+            lbl_filename = f"{video_name_base}_frame_{frame_index}.txt"
+            jobs.append((frame_index, self.model.frame_pts(frame_index),
+                         os.path.join(img_dir, img_filename), os.path.join(lbl_dir, lbl_filename)))
+
+        worker_count = max(1, min((os.cpu_count() or 1) - 1, len(jobs) // self.EXPORT_FRAMES_PER_WORKER))
+        bounds = np.linspace(0, len(jobs), worker_count + 1).astype(int)
+        chunk_args = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            chunk_jobs = jobs[start:end]
+            chunk_frames = [job[0] for job in chunk_jobs]
+            chunk_args.append((
+                self.model.file_path, self.model.frame_duration, chunk_jobs,
+                {frame_index: label_files[frame_index] for frame_index in chunk_frames},
+                label_rows[np.isin(label_rows[:, 0], chunk_frames)],
+                yolo_index_lookup, (label_width, label_height),
+                self.EXPORT_IMAGE_FORMAT, self.EXPORT_JPEG_QUALITY, self.EXPORT_IMAGE_SIZE,
+            ))
 
-            try:
-                pil_image = av_frame.to_image()
-                img_width, img_height = pil_image.size
-                if img_width <= 0 or img_height <= 0:
-                    print(f"  ERROR: Invalid dimensions for frame {frame_index} ({img_width}x{img_height}). Skipping.")
-                    error_count += 1
-                    continue
+        try:
+            if worker_count == 1:
+                results = [export_chunk(*chunk_args[0])]
+            else:
+                print(f"  Exporting with {worker_count} worker processes")
+                # Spawned rather than forked: this process has Qt and decoder threads running
+                with multiprocessing.get_context("spawn").Pool(worker_count) as pool:
+                    results = pool.starmap(export_chunk, chunk_args)
+        except Exception as e:
+            self.view.show_error_message("Export Error", f"Failed to export frames: {e}")
+            return
 
-                img_filename = f"{video_name_base}_frame_{frame_index}.bmp"
-                img_path = os.path.join(img_dir, img_filename)
-                pil_image.save(img_path, "BMP")
-
-                yolo_lines = []
-                rectangles_for_this_frame = rects_by_frame[frame_index]
-                for rect in rectangles_for_this_frame:
-                    class_id = rect['class_id']
-                    x1, y1, x2, y2 = rect['x1'], rect['y1'], rect['x2'], rect['y2']
-                    
-                    if class_id not in class_id_to_yolo_index:
-                        print(f"  WARNING: Class ID {class_id} not found in project map for frame {frame_index}. Skipping this box.")
-                        continue
-                    yolo_class_index = class_id_to_yolo_index[class_id]
-                    
-                    box_width = x2 - x1
-                    box_height = y2 - y1
-                    center_x = x1 + box_width / 2
-                    center_y = y1 + box_height / 2
-                    
-                    norm_center_x = center_x / img_width
-                    norm_center_y = center_y / img_height
-                    norm_width = box_width / img_width
-                    norm_height = box_height / img_height
-                    
-                    norm_center_x = max(0.0, min(1.0, norm_center_x))
-                    norm_center_y = max(0.0, min(1.0, norm_center_y))
-                    norm_width = max(0.0, min(1.0, norm_width))
-                    norm_height = max(0.0, min(1.0, norm_height))
-
-                    yolo_lines.append(f"{yolo_class_index} {norm_center_x:.6f} {norm_center_y:.6f} {norm_width:.6f} {norm_height:.6f}")
-                
-                lbl_filename = f"{video_name_base}_frame_{frame_index}.txt"
-                lbl_path = os.path.join(lbl_dir, lbl_filename)
-                with open(lbl_path, 'w') as f:
-                    f.write("\n".join(yolo_lines))
-                
-                export_count += 1
-            except Exception as e:
-                print(f"  ERROR processing frame {frame_index}: {e}")
-                error_count += 1
+        for chunk_count, chunk_errors in results:
+            export_count += chunk_count
+            for error in chunk_errors:
+                print(error)
+        error_count = len(jobs) - export_count
         
         # --- Report Results --- 
         message = f"Export complete for '{video_name}'.\n"
@@ -535,10 +736,10 @@ class VideoController:
         # Prepare and show the log dialog
         self.view.clear_log_dialog()
         self.view.show_log_dialog()
-        self.view.training_log_dialog.stop_button.setEnabled(True)  # Enable stop button
+        self.view.set_stop_training_enabled(True)  # Enable stop button
 
-        # Create a queue for log messages
-        self.log_queue = Queue()
+        # Shared-memory ring for log messages (cheaper than pickling each line through a Queue)
+        self.log_queue = SharedLogRing()
         
         # Start the training process
         self.training_process = Process(
@@ -547,39 +748,52 @@ class VideoController:
         )
         self.training_process.start()
         
-        # Start the log processing timer
-        self.log_timer.start(100)  # Check queue every 100ms
+        # Show log messages as they arrive instead of polling the ring on a timer
+        self.log_reader = LogReader(self.log_queue)
+        self.log_reader.messages.connect(self._dispatch_log_messages, Qt.QueuedConnection)
+        self.log_reader.start()
         
         # Update UI state
         self.is_training = True
         self.view.train_button.setEnabled(False)
         self.view.train_button.setText("Training...")
 
-    def _process_log_queue(self):
-        """Process log messages from the training process."""
-        if not self.log_queue:
-            return
-
-        while not self.log_queue.empty():
-            try:
-                message = self.log_queue.get_nowait()
-                
+    def _dispatch_log_messages(self, messages):
+        """Handle a batch of log messages from the training process."""
+        text = []
+        for message in messages:
+            if message.startswith("TRAINING_COMPLETE") or message.startswith("TRAINING_ERROR:"):
+                # Show the output that came before the marker first
+                if text:
+                    self.view.append_log_text("".join(text))
+                    text = []
+                if not self.is_training:
+                    continue
                 if message.startswith("TRAINING_COMPLETE"):
                     self._training_finished(True, "Training completed successfully")
-                elif message.startswith("TRAINING_ERROR:"):
+                else:
                     error_msg = message[len("TRAINING_ERROR:"):]
                     self._training_finished(False, error_msg)
-                else:
-                    self.view.append_log_text(message)
-            except Exception as e:
-                print(f"Error processing log message: {e}")
+            else:
+                text.append(message)
+        if text:
+            self.view.append_log_text("".join(text))
+
+    def _stop_log_reader(self):
+        """Stop the log reader and close the ring it reads"""
+        if self.log_reader:
+            self.log_reader.stop()
+            self.log_reader = None
+        if self.log_queue:
+            self.log_queue.close()
+            self.log_queue = None
 
     def _training_finished(self, success, message):
         """Handle training completion."""
         self.is_training = False
         self.view.train_button.setEnabled(True)
         self.view.train_button.setText("Train Model")
-        self.view.training_log_dialog.stop_button.setEnabled(False)  # Disable stop button
+        self.view.set_stop_training_enabled(False)  # Disable stop button
         
         if self.training_process:
             if self.training_process.is_alive():
@@ -590,11 +804,7 @@ class VideoController:
                     pass  # Ignore any errors during join
             self.training_process = None
         
-        if self.log_queue:
-            self.log_queue.close()
-            self.log_queue = None
-        
-        self.log_timer.stop()
+        self._stop_log_reader()
         
         if success:
             self.view.show_info_message("Training Finished", message)
@@ -609,6 +819,10 @@ class VideoController:
 
     def cleanup(self):
         """Clean up resources when the application is closing."""
+        self._disconnect_signals()
+        self._nav_coalesce.stop()
+        self._seek_timer.stop()
+        self.timer.stop()
         if self.is_training and self.training_process:
             self.training_process.terminate()
             try:
@@ -617,12 +831,7 @@ class VideoController:
                 pass  # Ignore any errors during join
             self.training_process = None
         
-        if self.log_queue:
-            self.log_queue.close()
-            self.log_queue = None
-        
-        self.log_timer.stop()
+        self._stop_log_reader()
         
         # Ensure log dialog is closed and logging is restored
-        if hasattr(self.view, 'training_log_dialog'):
-            self.view.training_log_dialog.close()
+        self.view.close_log_dialog()
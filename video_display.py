@@ -1,6 +1,19 @@
-from PySide6.QtWidgets import QGraphicsRectItem, QGraphicsView, QGraphicsScene, QGraphicsItem
-from PySide6.QtCore import Qt, QRectF, Signal, QPoint
-from PySide6.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QBrush
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem
+from PySide6.QtCore import Qt, QRectF, Signal, QPoint, QTimer
+from PySide6.QtGui import QImage, QPixmap, QPen, QColor, QBrush, QOpenGLContext, QTransform
+import logging
+import numpy as np
+from av.video.reformatter import VideoReformatter
+try:
+    from PySide6.QtOpenGLWidgets import QOpenGLWidget
+except ImportError:  # Qt built without OpenGL widgets
+    QOpenGLWidget = None
+
+logger = logging.getLogger(__name__)
+
+def _opengl_available():
+    """Whether an OpenGL context can be created on this platform (not on offscreen or broken drivers)"""
+    return QOpenGLWidget is not None and QOpenGLContext().create()
 
 class VideoDisplay(QGraphicsView):
     """A QGraphicsView-based widget for displaying video frames"""
@@ -11,16 +24,34 @@ class VideoDisplay(QGraphicsView):
     # Signal to emit when a rectangle is drawn
     rectangle_drawn = Signal(int, int, int, int)  # x1, y1, x2, y2
     
+    # Render through an OpenGL viewport when a context can be created, else the raster engine
+    USE_OPENGL_VIEWPORT = True
+    # Quiet period after the last resize event before the frame is refit to the view
+    RESIZE_SETTLE_MS = 50
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
         # Set up the scene
         self.scene = QGraphicsScene(self)
+        # A frame and a handful of boxes: a BSP index costs more to maintain than it saves
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
         self.setScene(self.scene)
         
-        # Set up the view
-        self.setRenderHint(QPainter.Antialiasing)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        # Set up the view. No antialiasing: the frame is a pixmap and the boxes are
+        # axis-aligned, so it would only put every draw on the slower raster path.
+        if self.USE_OPENGL_VIEWPORT and _opengl_available():
+            # The frame is scaled and composited with its boxes on the GPU. A GL viewport
+            # redraws whole frames, so partial updates don't apply.
+            self.setViewport(QOpenGLWidget())
+            self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        else:
+            # Only the regions items dirtied are repainted, so dragging out a box doesn't
+            # repaint the whole scaled frame on every mouse move
+            self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.DontSavePainterState)
+        # Nothing is antialiased, so exposed areas need no extra margin for it
+        self.setOptimizationFlag(QGraphicsView.DontAdjustForAntialiasing)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
@@ -28,17 +59,29 @@ class VideoDisplay(QGraphicsView):
         
         # Enable mouse tracking
         self.setMouseTracking(True)
+        self._last_cursor_position = None  # (x, y) last sent through cursor_position_changed
         
         # Initialize variables
         self.current_image = None
-        self.image_item = None
+        self.image_item = None  # Created with the first frame, then reused
+        self._image_size = None  # (width, height) the scene rect was last set for
+        self._source_frame = None  # Last av frame shown, converted again when the display size changes
+        self._reformatter = VideoReformatter()  # Keeps one swscale context across frames
         self.zoom_factor = 1.0
         
         # Rectangle drawing variables
         self.drawing_rectangle = False
         self.start_point = None
         self.current_rect = None
-        self.rectangles = []  # List to store rectangles for current frame
+        self.rectangles = ()  # (N, 4) array of x1, y1, x2, y2 for the current frame
+        self._rect_items = []  # Pool of rectangle items; those past the current frame's count are hidden
+        self._rect_pen = QPen(QColor(255, 0, 0), 2)
+        
+        # A window drag sends a burst of resize events; the frame is refit once it settles
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(self.RESIZE_SETTLE_MS)
+        self._resize_timer.timeout.connect(self._fit_after_resize)
         
         # Set up the background
         self.setBackgroundBrush(Qt.black)
@@ -53,48 +96,70 @@ class VideoDisplay(QGraphicsView):
             
         # Convert the frame to QImage if it's not already
         if hasattr(frame, 'to_ndarray'):
-            # Handle av.video.frame.VideoFrame objects
-            frame_array = frame.to_ndarray(format='rgb24')
-            height, width, channel = frame_array.shape
-            bytes_per_line = 3 * width
-            image = QImage(frame_array.data, width, height, bytes_per_line, QImage.Format_RGB888)
+            # Handle av.video.frame.VideoFrame objects. swscale converts straight to 32-bit
+            # BGRA, which is QImage's native RGB32 layout: QImage wraps the converted plane
+            # (rgb_frame keeps it alive) and fromImage below needs no format conversion.
+            # While unzoomed it also scales down to the viewport in the same pass, so paints
+            # blit a screen-sized pixmap instead of resampling the full frame every time.
+            self._source_frame = frame
+            frame_size = (frame.width, frame.height)
+            width, height = self._display_size(*frame_size)
+            rgb_frame = self._reformatter.reformat(frame, format='bgra', width=width, height=height)
+            plane = rgb_frame.planes[0]
+            image = QImage(plane, rgb_frame.width, rgb_frame.height, plane.line_size, QImage.Format_RGB32)
         elif isinstance(frame, QImage):
             # Frame is already a QImage
+            self._source_frame = None
             image = frame
+            frame_size = (image.width(), image.height())
         else:
             # Assume frame is a numpy array with shape (height, width, 3)
+            self._source_frame = None
             height, width, channel = frame.shape
             bytes_per_line = 3 * width
             image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
+            frame_size = (width, height)
         
-        # Convert QImage to QPixmap
+        # Convert QImage to QPixmap (a copy, so the frame's buffer can be released after this)
         pixmap = QPixmap.fromImage(image)
-        
-        # Store current transform and zoom factor
-        current_transform = self.transform()
-        current_zoom = self.zoom_factor
-        
-        # Clear the scene
-        self.scene.clear()
-        
-        # Add the image to the scene
-        self.image_item = self.scene.addPixmap(pixmap)
         self.current_image = pixmap
         
-        # Set the scene rect to the image size
-        self.scene.setSceneRect(self.image_item.boundingRect())
-        
-        # If this is the first frame, fit the view
-        if current_zoom == 1.0:
-            self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        # The pixmap item is created once and then only has its pixmap swapped, so the
+        # scene isn't torn down and rebuilt (with every rectangle) on each frame
+        if self.image_item is None:
+            self.image_item = self.scene.addPixmap(pixmap)
         else:
-            # Restore the previous transform
-            self.setTransform(current_transform)
-            self.zoom_factor = current_zoom
+            self.image_item.setPixmap(pixmap)
+        # Scene coordinates stay in frame pixels (what boxes and the mouse use) whatever
+        # size the pixmap was converted at
+        self.image_item.setTransform(QTransform.fromScale(frame_size[0] / pixmap.width(),
+                                                          frame_size[1] / pixmap.height()))
         
-        # Redraw all rectangles
-        self._draw_rectangles()
+        # The scene rect and fit only change when the frame size does
+        if frame_size != self._image_size:
+            self._image_size = frame_size
+            self.scene.setSceneRect(self.image_item.sceneBoundingRect())
+            # Keep the user's zoom; only refit while at the original size
+            if self.zoom_factor == 1.0:
+                self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
     
+    def _display_size(self, width, height):
+        """Size to convert a frame to: fitted to the viewport while unzoomed, else full resolution"""
+        if self.zoom_factor != 1.0:
+            return width, height  # Zoomed in, where the detail is wanted
+        ratio = self.devicePixelRatioF()
+        scale = min(self.viewport().width() * ratio / width, self.viewport().height() * ratio / height)
+        if not 0 < scale < 1.0:
+            return width, height
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _refresh_scaled_frame(self):
+        """Convert the last frame again if the zoom or viewport size changed the size it needs"""
+        frame = self._source_frame
+        if frame is not None and self._display_size(frame.width, frame.height) != (
+                self.current_image.width(), self.current_image.height()):
+            self.display_frame(frame)
+
     def mousePressEvent(self, event):
         """Handle mouse press events for rectangle drawing"""
         if event.button() == Qt.LeftButton:
@@ -102,12 +167,12 @@ class VideoDisplay(QGraphicsView):
             scene_pos = self.mapToScene(event.pos())
             
             # Check if we're within the image bounds
-            if self.image_item and self.image_item.boundingRect().contains(scene_pos):
+            if self.image_item and self.image_item.sceneBoundingRect().contains(scene_pos):
                 self.drawing_rectangle = True
                 self.start_point = scene_pos
                 self.current_rect = self.scene.addRect(
                     QRectF(self.start_point, self.start_point),
-                    QPen(QColor(255, 0, 0), 2),
+                    self._rect_pen,
                     QBrush(Qt.NoBrush)
                 )
                 self.current_rect.setZValue(1)
@@ -127,24 +192,20 @@ class VideoDisplay(QGraphicsView):
             self.current_rect.setRect(QRectF(self.start_point, scene_pos))
         
         # Handle cursor position tracking
+        position = (-1, -1)  # Outside the image, or no image loaded
         if self.image_item:
             # Get the image rect
-            image_rect = self.image_item.boundingRect()
+            image_rect = self.image_item.sceneBoundingRect()
             
             # Check if the cursor is within the image bounds
             if image_rect.contains(scene_pos):
                 # Calculate the position relative to the image
-                x = int(scene_pos.x() - image_rect.left())
-                y = int(scene_pos.y() - image_rect.top())
-                
-                # Emit the position
-                self.cursor_position_changed.emit(x, y)
-            else:
-                # Cursor is outside the image
-                self.cursor_position_changed.emit(-1, -1)
-        else:
-            # No image loaded
-            self.cursor_position_changed.emit(-1, -1)
+                position = (int(scene_pos.x() - image_rect.left()), int(scene_pos.y() - image_rect.top()))
+        
+        # Most moves stay within the same image pixel; only a change is emitted
+        if position != self._last_cursor_position:
+            self._last_cursor_position = position
+            self.cursor_position_changed.emit(*position)
     
     def mouseReleaseEvent(self, event):
         """Handle mouse release events for rectangle drawing"""
@@ -153,7 +214,7 @@ class VideoDisplay(QGraphicsView):
             end_pos = self.mapToScene(event.pos())
             
             # Get the image rect
-            image_rect = self.image_item.boundingRect()
+            image_rect = self.image_item.sceneBoundingRect()
             
             # Check if both points are within the image bounds
             if (image_rect.contains(self.start_point) and 
@@ -165,13 +226,14 @@ class VideoDisplay(QGraphicsView):
                 x2 = int(max(self.start_point.x(), end_pos.x()) - image_rect.left())
                 y2 = int(max(self.start_point.y(), end_pos.y()) - image_rect.top())
                 
-                # Print the rectangle coordinates (for debugging)
-                print(f"Rectangle drawn: ({x1}, {y1}) to ({x2}, {y2})")
+                # Log the rectangle coordinates (for debugging)
+                logger.debug("Rectangle drawn: (%s, %s) to (%s, %s)", x1, y1, x2, y2)
                 
                 # Emit the rectangle coordinates
                 self.rectangle_drawn.emit(x1, y1, x2, y2)
             
-            # Clean up
+            # Clean up; the drawn box comes back through set_rectangles once it's saved
+            self.scene.removeItem(self.current_rect)
             self.drawing_rectangle = False
             self.start_point = None
             self.current_rect = None
@@ -205,32 +267,37 @@ class VideoDisplay(QGraphicsView):
         new_pos = self.mapToScene(event.position().toPoint())
         delta = new_pos - old_pos
         self.translate(delta.x(), delta.y())
+        self._refresh_scaled_frame()
     
     def resizeEvent(self, event):
         """Handle resize events to maintain aspect ratio"""
         super().resizeEvent(event)
-        
+        # Restarted by every event, so only the last one in a burst refits
+        self._resize_timer.start()
+    
+    def _fit_after_resize(self):
+        """Fit the frame to the view once resizing has settled"""
         # If there's an image, fit it to the view
         if self.image_item:
-            self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio) 
+            self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+            self._refresh_scaled_frame()
     
     def set_rectangles(self, rectangles):
-        """Set the rectangles to display for the current frame"""
+        """Set the rectangles to display for the current frame (an (N, 4) array of x1, y1, x2, y2)"""
         self.rectangles = rectangles
         self._draw_rectangles()
     
     def _draw_rectangles(self):
         """Draw all rectangles for the current frame"""
-        # Remove existing rectangles
-        for item in self.scene.items():
-            if isinstance(item, QGraphicsRectItem):
-                self.scene.removeItem(item)
-                
-        # Draw new rectangles
-        for rect in self.rectangles:
-            x1, y1, x2, y2 = rect
-            self.scene.addRect(
-                QRectF(x1, y1, x2 - x1, y2 - y1),
-                QPen(QColor(255, 0, 0), 2),
-                QBrush(Qt.NoBrush)
-            ).setZValue(1) 
\ No newline at end of file
+        # tolist() hands Qt plain Python ints instead of numpy scalars
+        boxes = np.asarray(self.rectangles).reshape(-1, 4).tolist()
+        # Reuse pooled items, only adding new ones when this frame has more boxes than any before
+        while len(self._rect_items) < len(boxes):
+            item = self.scene.addRect(QRectF(), self._rect_pen, QBrush(Qt.NoBrush))
+            item.setZValue(1)
+            self._rect_items.append(item)
+        for item, (x1, y1, x2, y2) in zip(self._rect_items, boxes):
+            item.setRect(x1, y1, x2 - x1, y2 - y1)
+            item.setVisible(True)
+        for item in self._rect_items[len(boxes):]:
+            item.setVisible(False)
@@ -1,36 +1,245 @@
 import av
-from PySide6.QtCore import QObject, Signal
-import datetime
+from PySide6.QtCore import QObject, Signal, Slot, QThread, QTimer, Qt
 import os
+import logging
+import threading
+import bisect
+import numpy as np
+from collections import deque, OrderedDict
 from database import Database
 
+# Per-frame / per-rectangle messages go here at DEBUG level; the disabled case costs next
+# to nothing, where print() formats and writes on every seek and every rectangle
+logger = logging.getLogger(__name__)
+
+# --- Seek Scanning ---
+# Frames this close to a seek target are always fully decoded. It has to cover the decoder's
+# reordering span, so the packets of frames near the target never arrive while skipping.
+FULL_DECODE_MARGIN_FRAMES = 16
+
+def decode_to(stream, frame_generator, target_pts, frame_duration):
+    """Return the first frame at or after target_pts from a decoder, or None at the end of stream.
+
+    Frames well short of the target are only needed as references, so while the scan is more
+    than FULL_DECODE_MARGIN_FRAMES away the codec skips decoding non-reference frames.
+    """
+    codec_context = stream.codec_context
+    # Frame threading holds up to thread_count more packets in flight before output
+    margin = FULL_DECODE_MARGIN_FRAMES + codec_context.thread_count
+    full_decode_pts = target_pts - margin * frame_duration
+    try:
+        for frame in frame_generator:
+            if frame.pts >= target_pts:
+                return frame
+            # Switched on only after a first full frame, past what the codec buffered while starting
+            codec_context.skip_frame = 'NONREF' if frame.pts < full_decode_pts else 'DEFAULT'
+        return None
+    finally:
+        codec_context.skip_frame = 'DEFAULT'
+
+# Emitted for frames without rectangles
+_NO_RECTANGLES = np.empty((0, 5), dtype=np.int32)
+_NO_RECTANGLES.setflags(write=False)
+
+# --- Database Writer ---
+class RectangleSaveWorker(QObject):
+    """Saves rectangles on a background thread so SQLite commits never block the GUI"""
+    rectangle_saved = Signal(bool, int, int, int)  # success, video_id, frame_index, class_id
+    # Rectangles drawn within this long of the first unsaved one share a single commit
+    SAVE_BATCH_MS = 200
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db  # Uses its own per-thread connection from this thread
+        self._pending = []  # (video_id, frame_index, class_id, x1, y1, x2, y2) rows not yet committed
+
+    @Slot(int, int, int, int, int, int, int)
+    def save_rectangle(self, video_id, frame_index, class_id, x1, y1, x2, y2):
+        self._pending.append((video_id, frame_index, class_id, x1, y1, x2, y2))
+        if len(self._pending) == 1:
+            QTimer.singleShot(self.SAVE_BATCH_MS, self._commit_pending)
+
+    @Slot(list)
+    def save_rectangles(self, rows):
+        """Save a batch of rectangles now, together with any still waiting for their timer"""
+        self._pending.extend(rows)
+        self._commit_pending()
+
+    def _commit_pending(self):
+        """Write every pending rectangle in one transaction"""
+        rows, self._pending = self._pending, []
+        if not rows:
+            return  # Already written by flush
+        for row, success in zip(rows, self.db.save_rectangles(rows)):
+            # Reported back through a signal: printing here would touch the log widget off the GUI thread
+            self.rectangle_saved.emit(success, row[0], row[1], row[2])
+
+    @Slot()
+    def flush(self):
+        """Write pending rectangles now; once a blocking call to it returns, every earlier save has finished"""
+        self._commit_pending()
+
+# --- Frame Prefetch ---
+class FramePrefetchWorker(QObject):
+    """Decodes likely seek targets on a background thread, using its own container"""
+    CACHE_SIZE = 8  # Decoded frames kept, least recently used dropped first
+
+    def __init__(self):
+        super().__init__()
+        self.generation = 0  # Bumped to cancel requests that are queued or in progress
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # frame_index -> decoded frame
+        self._container = None
+        self._file_path = None
+
+    @Slot(int, str, int, list)
+    def prefetch(self, generation, file_path, frame_duration, targets):
+        if generation != self.generation:
+            return
+        try:
+            if file_path != self._file_path:
+                self.close()
+                self._container = av.open(file_path)
+                self._file_path = file_path
+            stream = self._container.streams.video[0]
+            for frame_index, target_pts in targets:
+                with self._lock:
+                    if generation != self.generation:
+                        return
+                    if frame_index in self._cache:
+                        continue
+                self._container.seek(target_pts, stream=stream, backward=True)
+                # Same pick as VideoModel.seek: the first frame at or after the target
+                frame = decode_to(stream, self._container.decode(video=0), target_pts, frame_duration)
+                if frame is None:
+                    continue
+                with self._lock:
+                    if generation != self.generation:
+                        return
+                    self._cache[frame_index] = frame
+                    if len(self._cache) > self.CACHE_SIZE:
+                        self._cache.popitem(last=False)
+        except Exception:
+            # Prefetching is only a shortcut; a failed decode here just means seek decodes it itself
+            self.close()
+
+    def get(self, frame_index):
+        """Return the prefetched frame for an index, or None (called from the GUI thread)"""
+        with self._lock:
+            frame = self._cache.get(frame_index)
+            if frame is not None:
+                self._cache.move_to_end(frame_index)
+            return frame
+
+    def cancel(self):
+        """Cancel pending requests and return the generation for the next one"""
+        with self._lock:
+            self.generation += 1
+            return self.generation
+
+    def clear(self):
+        """Cancel pending requests and drop every cached frame"""
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def close(self):
+        """Close the worker's container (on its thread, or once the thread has stopped)"""
+        if self._container is not None:
+            self._container.close()
+        self._container = None
+        self._file_path = None
+
 class VideoModel(QObject):
     # Signals
-    frame_changed = Signal(object)  # Emits the current frame
+    frame_changed = Signal(object)  # Emits the decoded av.VideoFrame untouched; receivers convert it themselves
     frame_count_changed = Signal(int)  # Emits the total frame count
     current_frame_index_changed = Signal(int)  # Emits the current frame index
     playback_state_changed = Signal(bool)  # Emits the playing state
     fps_changed = Signal(float)  # Emits the current FPS
-    rectangles_changed = Signal(list)  # Emits the list of rectangles for the current frame
+    rectangles_changed = Signal(object)  # Emits an (N, 5) array of the current frame's rectangles
+    _save_rectangle_requested = Signal(int, int, int, int, int, int, int)  # Queued to the save worker
+    _save_rectangles_requested = Signal(list)  # Bulk adds, queued to the save worker
+    _flush_saves_requested = Signal()
+    _prefetch_requested = Signal(int, str, int, list)  # Queued to the prefetch worker
+
+    # Frames decoded ahead of the display while playing
+    READ_AHEAD_FRAMES = 8
+    # get_frame_by_index decodes on, instead of seeking, to targets at most this far ahead
+    INDEX_SCAN_AHEAD_FRAMES = 30
+    # Idle time after a frame change before likely seek targets are prefetched
+    PREFETCH_IDLE_MS = 50
+    # Decoded frames kept for revisits through seek and get_frame_by_index, least recently used dropped first
+    FRAME_CACHE_SIZE = 32
+    # Videos up to this many frames get an exact PTS index at load (one pass over the packets)
+    PTS_INDEX_MAX_FRAMES = 100000
     
     def __init__(self):
         super().__init__()
         self.container = None
         self.stream = None
         self.current_frame = None
+        self._first_frame = None  # Frame 0 as decoded by load_video, shown again on reset
         self.frame_count = 0
         self.current_frame_index = 0
         self.is_playing = False
         self.frame_generator = None
         self.first_frame_pts = None
+        self._pts_index = None  # Sorted PTS of every frame, when load_video could index the stream
+        self._keyframe_pts = None  # Sorted PTS of the keyframes, built in the same pass
         self.frame_duration = None
+        self._frame_step = None
         self.project_id = None  # Added project ID
         self.video_id = None
         self.video_name = None
+        self.file_path = None
         self.db = Database()
+
+        # Single writer thread for rectangle saves (SQLite serializes writes anyway)
+        self._db_thread = QThread()
+        self._save_worker = RectangleSaveWorker(self.db)
+        self._save_worker.moveToThread(self._db_thread)
+        self._save_rectangle_requested.connect(self._save_worker.save_rectangle, Qt.QueuedConnection)
+        self._save_rectangles_requested.connect(self._save_worker.save_rectangles, Qt.QueuedConnection)
+        self._flush_saves_requested.connect(self._save_worker.flush, Qt.BlockingQueuedConnection)
+        self._save_worker.rectangle_saved.connect(self._on_rectangle_saved)
+        self._db_thread.start()
+
+        # Playback read-ahead: while playing, a worker thread decodes into this bounded buffer
+        # so advance_frame only has to pop a ready frame on the GUI thread
+        self._read_ahead = deque()
+        self._read_ahead_cond = threading.Condition()
+        self._read_ahead_thread = None
+        self._read_ahead_stop = False
+        self._read_ahead_done = False  # Worker reached the end of the stream
+        self._read_ahead_error = None  # Decode error hit by the worker, reported on the GUI thread
+
+        # Seek prefetch: once the user is idle, the likely next seek targets are decoded in
+        # the background so seek can show them without the keyframe-to-target decode
+        self._prefetch_thread = QThread()
+        self._prefetch_worker = FramePrefetchWorker()
+        self._prefetch_worker.moveToThread(self._prefetch_thread)
+        self._prefetch_requested.connect(self._prefetch_worker.prefetch, Qt.QueuedConnection)
+        self._prefetch_thread.start()
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(self.PREFETCH_IDLE_MS)
+        self._prefetch_timer.timeout.connect(self._request_prefetch)
+        self.current_frame_index_changed.connect(self._schedule_prefetch)
+        # Set when a prefetched frame is shown: the playback decoder is then left at the
+        # old position and is moved only if stepping or playback continues from here
+        self._decoder_stale = False
+        # get_frame_by_index decodes on a container of its own, so random access never moves
+        # the playback decoder. (frame generator, last pts) of its last fetch: a later, nearby
+        # index keeps decoding from it instead of seeking
+        self._preview_container = None
+        self._index_decoder = None
+        self._frame_cache = OrderedDict()  # frame_index -> decoded frame, see FRAME_CACHE_SIZE
         
         # Dictionary to store rectangles for each frame
-        self.rectangles = {}  # frame_index -> list of (class_id, x1, y1, x2, y2)
+        # frame_index -> read-only (N, 5) int32 array of (class_id, x1, y1, x2, y2), emitted as is
+        self.rectangles = {}
+        self._labeled_frames = None  # Sorted keys of self.rectangles, rebuilt when a frame is added
     
     def set_project(self, project_id):
         """Set the current project ID"""
@@ -47,8 +256,20 @@ class VideoModel(QObject):
             return
             
         try:
+            self._stop_read_ahead(discard=True)  # The worker must not keep decoding the old file
+            self._prefetch_worker.clear()
+            self._decoder_stale = False
+            self._close_preview()
+            self._first_frame = None
+            self._pts_index = None
+            self._keyframe_pts = None
+            self._frame_cache.clear()
             self.container = av.open(file_path)
+            self.file_path = file_path
             self.stream = self.container.streams.video[0]
+            # Let FFmpeg decode on frame and slice threads, one per core
+            self.stream.thread_type = "AUTO"
+            self.stream.codec_context.thread_count = 0
             
             # Try to get frame count from stream frames
             self.frame_count = self.stream.frames if self.stream.frames is not None else 0
@@ -62,24 +283,27 @@ class VideoModel(QObject):
                 duration_str = self.stream.metadata.get('DURATION', '')
                 if duration_str:
                     try:
-                        # Split by colon to get hours, minutes, seconds
-                        parts = duration_str.split(':')
-                        if len(parts) == 3:
-                            hours = float(parts[0])
-                            minutes = float(parts[1])
-                            seconds = float(parts[2])
-                            total_seconds = hours * 3600 + minutes * 60 + seconds
-                            # Calculate frame count from duration and frame rate
-                            self.frame_count = int(total_seconds * self.stream.average_rate)
-                    except (ValueError, IndexError):
+                        # HH:MM:SS.fraction
+                        hours, minutes, seconds = duration_str.split(':', 2)
+                        total_seconds = (int(hours) * 60 + int(minutes)) * 60 + float(seconds)
+                        # Calculate frame count from duration and frame rate
+                        self.frame_count = int(total_seconds * self.stream.average_rate)
+                    except ValueError:
                         print(f"Error parsing duration string: {duration_str}")
             
+            # Exact frame timestamps from one pass over the packets (nothing is decoded), so
+            # seeks hit the right frame even when frame durations vary
+            if 0 < self.frame_count <= self.PTS_INDEX_MAX_FRAMES:
+                self._pts_index, self._keyframe_pts = self._build_pts_index(file_path)
+                if self._pts_index is not None:
+                    self.frame_count = len(self._pts_index)
+            
             # If all methods failed, use a default value
             if not self.frame_count:
                 self.frame_count = 1000  # Default fallback
             
-            print(f"Frame count: {self.frame_count}")
-            print(f"Stream metadata: {self.stream.metadata}")
+            logger.info("Frame count: %s", self.frame_count)
+            logger.info("Stream metadata: %s", self.stream.metadata)
             
             # Store video information in the database
             self.video_name = os.path.basename(file_path)
@@ -98,6 +322,7 @@ class VideoModel(QObject):
             
             # Clear and load rectangles from the database for this video
             self.rectangles = {}
+            self._labeled_frames = None
             self._load_rectangles_from_db()
             
             # Get the first frame to store its PTS
@@ -105,10 +330,12 @@ class VideoModel(QObject):
             try:
                 first_frame = next(self.frame_generator)
                 self.first_frame_pts = first_frame.pts
-                # Calculate frame duration from stream time base
-                self.frame_duration = int(self.stream.time_base.denominator / 
-                                        (self.stream.time_base.numerator * self.stream.average_rate))
+                # Exact time-base ticks per frame (a Fraction): at 23.976 fps in a 1/1000 time
+                # base it is 41.708, and truncating it once drifts by a frame every ~60 frames
+                self._frame_step = 1 / (self.stream.time_base * self.stream.average_rate)
+                self.frame_duration = round(self._frame_step)  # Whole ticks, for scan margins
                 self.current_frame = first_frame
+                self._first_frame = first_frame  # Reused by reset_to_start
                 self.frame_changed.emit(self.current_frame)
                 self.current_frame_index_changed.emit(self.current_frame_index)
                 
@@ -121,26 +348,55 @@ class VideoModel(QObject):
             print(f"Error loading video: {e}")
             self.cleanup()
     
+    def _build_pts_index(self, file_path):
+        """Sorted PTS of every frame and of the keyframes in the video stream, read from its packets, or (None, None)"""
+        pts = []
+        keyframe_pts = []
+        try:
+            with av.open(file_path) as container:  # Own container: the playback one stays where it is
+                stream = container.streams.video[0]
+                for packet in container.demux(stream):
+                    if packet.pts is None or packet.is_discard:
+                        continue
+                    pts.append(packet.pts)
+                    if packet.is_keyframe:
+                        keyframe_pts.append(packet.pts)
+        except Exception as e:
+            print(f"Error indexing frame timestamps: {e}")
+            return None, None
+        if not pts:
+            return None, None
+        return np.sort(np.array(pts, dtype=np.int64)), np.sort(np.array(keyframe_pts, dtype=np.int64))
+
+    def _keyframe_before(self, target_pts):
+        """PTS of the last keyframe at or before target_pts, or None when unknown"""
+        if self._keyframe_pts is None:
+            return None
+        i = np.searchsorted(self._keyframe_pts, target_pts, side='right') - 1
+        return int(self._keyframe_pts[i]) if i >= 0 else None
+
+    def frame_pts(self, frame_index):
+        """PTS of a frame index: exact from the PTS index when there is one, else assuming a constant frame rate"""
+        if self._pts_index is not None:
+            return int(self._pts_index[frame_index])
+        # Rounded down: never past the frame, however the muxer rounded its timestamps
+        return self.first_frame_pts + int(frame_index * self._frame_step)
+
     def _load_rectangles_from_db(self):
         """Load rectangles (with class_id) from the database for the current video"""
         if self.video_id is None:
             return
             
         try:
-            db_rectangles = self.db.get_all_rectangles_for_video(self.video_id)
-            
-            # Organize rectangles by frame index: {frame_idx: [(class_id, x1, y1, x2, y2), ...]}
-            for rect in db_rectangles:
-                frame_index = rect['frame_index']
-                class_id = rect['class_id']
-                x1, y1, x2, y2 = rect['x1'], rect['y1'], rect['x2'], rect['y2']
-                
-                if frame_index not in self.rectangles:
-                    self.rectangles[frame_index] = []
-                
-                self.rectangles[frame_index].append((class_id, x1, y1, x2, y2))
+            # One query into an (N, 6) array in frame order, split into per-frame blocks
+            rows = self.db.get_rectangle_rows_for_video(self.video_id)
+            loaded_count = len(rows)
+            frames, starts = np.unique(rows[:, 0], return_index=True)
+            for frame_index, boxes in zip(frames.tolist(), np.split(rows[:, 1:].astype(np.int32), starts[1:])):
+                boxes.setflags(write=False)  # Shared with every receiver of rectangles_changed
+                self.rectangles[frame_index] = boxes
             
-            print(f"Loaded {len(db_rectangles)} rectangles from database for video {self.video_id}")
+            print(f"Loaded {loaded_count} rectangles from database for video {self.video_id}")
         except Exception as e:
             print(f"Error loading rectangles from database: {e}")
     
@@ -150,7 +406,9 @@ class VideoModel(QObject):
             return
             
         try:
-            self.current_frame = next(self.frame_generator)
+            if self._decoder_stale:
+                self._resync_decoder()
+            self.current_frame = self._next_frame()
             self.frame_changed.emit(self.current_frame)
             self.current_frame_index_changed.emit(self.current_frame_index)
             self._emit_rectangles_for_current_frame()
@@ -162,8 +420,19 @@ class VideoModel(QObject):
     
     def _emit_rectangles_for_current_frame(self):
         """Emit rectangles (with class_id) for the current frame"""
-        rects_data = self.rectangles.get(self.current_frame_index, [])
-        self.rectangles_changed.emit(rects_data) # Emit list of (class_id, x1, y1, x2, y2)
+        self.rectangles_changed.emit(self.rectangles.get(self.current_frame_index, _NO_RECTANGLES))
+
+    def _append_rectangles(self, frame_index, boxes):
+        """Add (class_id, x1, y1, x2, y2) rows to a frame's array; returns whether the frame had none before"""
+        existing = self.rectangles.get(frame_index)
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 5)
+        # A new array rather than an in-place append: the old one may still be held by receivers
+        combined = boxes if existing is None else np.concatenate((existing, boxes))
+        combined.setflags(write=False)
+        self.rectangles[frame_index] = combined
+        if existing is None:
+            self._labeled_frames = None
+        return existing is None
     
     def add_rectangle(self, class_id, x1, y1, x2, y2):
         """Add a rectangle with a class ID to the current frame"""
@@ -174,35 +443,16 @@ class VideoModel(QObject):
              print("Error: Cannot add rectangle, no class selected.")
              return
 
-        # Create a new rectangle tuple
-        rectangle_data = (class_id, x1, y1, x2, y2)
+        # Add the rectangle to the in-memory array
+        frame_existed_before = not self._append_rectangles(self.current_frame_index, (class_id, x1, y1, x2, y2))
         
-        frame_existed_before = self.current_frame_index in self.rectangles
-
-        # Initialize the list for this frame if it doesn't exist
-        if not frame_existed_before:
-            self.rectangles[self.current_frame_index] = []
-        
-        # Add the rectangle to the in-memory list
-        self.rectangles[self.current_frame_index].append(rectangle_data)
-        
-        # Save the rectangle to the database
-        try:
-            success = self.db.save_rectangle(
-                self.video_id,
-                self.current_frame_index,
-                class_id,
-                x1, y1, x2, y2
-            )
-            if success:
-                print(f"Rectangle saved to DB: Video {self.video_id}, Frame {self.current_frame_index}, Class {class_id}")
-            else:
-                # If saving failed (e.g., duplicate), remove from memory list?
-                # For now, we keep it in memory but log the issue.
-                 print(f"Rectangle not saved to DB (likely duplicate): Video {self.video_id}, Frame {self.current_frame_index}, Class {class_id}")
-
-        except Exception as e:
-            print(f"Error saving rectangle to database: {e}")
+        # Save the rectangle to the database on the writer thread; memory is already updated
+        self._save_rectangle_requested.emit(
+            self.video_id,
+            self.current_frame_index,
+            class_id,
+            x1, y1, x2, y2
+        )
         
         # Emit the updated rectangles for the current frame
         self._emit_rectangles_for_current_frame()
@@ -212,11 +462,66 @@ class VideoModel(QObject):
             # This could emit a signal, but for now, the controller will query
             pass 
 
-        print(f"Rectangle added to frame {self.current_frame_index}: Class {class_id}, Coords ({x1},{y1})-({x2},{y2})")
+        logger.debug("Rectangle added to frame %s: Class %s, Coords (%s,%s)-(%s,%s)",
+                     self.current_frame_index, class_id, x1, y1, x2, y2)
+    
+    def add_rectangles_bulk(self, items):
+        """Add many (frame_index, class_id, x1, y1, x2, y2) rectangles, saved in one transaction.
+
+        Returns the frames that had no rectangles before, for the caller's labeled frames list.
+        """
+        if self.video_id is None:
+            print("Error: Cannot add rectangles, no video loaded.")
+            return []
+        items = np.asarray(items, dtype=np.int64).reshape(-1, 6)
+        if not len(items):
+            return []
+        items = items[np.argsort(items[:, 0], kind='stable')]
+        frames, starts = np.unique(items[:, 0], return_index=True)
+        new_frames = [
+            frame_index
+            for frame_index, boxes in zip(frames.tolist(), np.split(items[:, 1:], starts[1:]))
+            if self._append_rectangles(frame_index, boxes)
+        ]
+        # One queued call and one commit on the writer thread for the whole batch
+        self._save_rectangles_requested.emit(
+            [(self.video_id, *row) for row in items.tolist()]
+        )
+        if self.current_frame_index in frames:
+            self._emit_rectangles_for_current_frame()
+        return new_frames
     
+    def _on_rectangle_saved(self, success, video_id, frame_index, class_id):
+        """Report the result of a background rectangle save"""
+        if success:
+            logger.debug("Rectangle saved to DB: Video %s, Frame %s, Class %s", video_id, frame_index, class_id)
+        else:
+            # If saving failed (e.g., duplicate), remove from memory list?
+            # For now, we keep it in memory but log the issue.
+            logger.warning("Rectangle not saved to DB (likely duplicate): Video %s, Frame %s, Class %s",
+                           video_id, frame_index, class_id)
+
+    def flush_pending_saves(self):
+        """Block until every queued rectangle save has been written"""
+        if self._db_thread.isRunning():
+            self._flush_saves_requested.emit()
+
+    def shutdown(self):
+        """Finish pending saves and stop the worker threads (call before closing the DB)"""
+        self.flush_pending_saves()
+        self._db_thread.quit()
+        self._db_thread.wait()
+        self._prefetch_timer.stop()
+        self._prefetch_worker.clear()
+        self._prefetch_thread.quit()
+        self._prefetch_thread.wait()
+        self._prefetch_worker.close()
+
     def get_frames_with_rectangles(self):
-        """Return a sorted list of frame indices that have rectangles"""
-        return sorted(list(self.rectangles.keys()))
+        """Return a sorted list of frame indices that have rectangles (shared, so don't modify it)"""
+        if self._labeled_frames is None:
+            self._labeled_frames = sorted(self.rectangles)
+        return self._labeled_frames
     
     def get_frame_by_index(self, frame_index):
         """Retrieve and return a specific frame by index, returning the frame object (e.g., av.VideoFrame)"""
@@ -226,36 +531,42 @@ class VideoModel(QObject):
         if not (0 <= frame_index < self.frame_count):
             print(f"Error: Frame index {frame_index} out of bounds (0-{self.frame_count-1})")
             return None
+        cached = self._cached_frame(frame_index)
+        if cached is not None:
+            return cached  # No seek there and back
             
         # Calculate target PTS
-        target_pts = self.first_frame_pts + (frame_index * self.frame_duration)
-        original_frame_index = self.current_frame_index # Store original position
+        target_pts = self.frame_pts(frame_index)
         
         try:
-            # Seek to the nearest keyframe before our target
-            # Use 'any' direction for potentially faster seeking if needed, but backward is safer.
-            self.container.seek(target_pts, stream=self.stream, backward=True) 
+            if self._preview_container is None:
+                self._preview_container = av.open(self.file_path)
+                preview_stream = self._preview_container.streams.video[0]
+                preview_stream.thread_type = "AUTO"  # Threaded like the playback stream
+                preview_stream.codec_context.thread_count = 0
+            stream = self._preview_container.streams.video[0]
+            index_decoder = self._index_decoder
+            self._index_decoder = None
+            if (index_decoder is not None and index_decoder[1] < target_pts
+                    <= index_decoder[1] + self.INDEX_SCAN_AHEAD_FRAMES * self.frame_duration):
+                # A little ahead of the last frame fetched here (e.g. an export in frame order):
+                # decoding on is cheaper than seeking back to the keyframe
+                temp_frame_generator = index_decoder[0]
+            else:
+                # Seek to the nearest keyframe before our target
+                # Use 'any' direction for potentially faster seeking if needed, but backward is safer.
+                self._preview_container.seek(target_pts, stream=stream, backward=True)
+                temp_frame_generator = self._preview_container.decode(video=0)
             
-            # Decode frames until we find the exact one or pass it
-            temp_frame_generator = self.container.decode(video=0)
-            found_frame_obj = None
-            while True:
-                try:
-                    frame = next(temp_frame_generator)
-                    # Using pts is more reliable than assuming decoded order matches index directly after seek
-                    if frame.pts >= target_pts: 
-                        # Check if it's the *exact* frame or the first one after the target PTS
-                        if frame.pts == target_pts or found_frame_obj is None:
-                             found_frame_obj = frame
-                        # If we already found a potential match and this one is later, break
-                        if frame.pts > target_pts and found_frame_obj is not None: 
-                           break 
-                except StopIteration:
-                    # Reached end of stream after seeking
-                    break 
+            # Decode frames until we reach the target, or the first one after it. Nothing past
+            # that frame is consumed, so the next call can carry on from here.
+            # Using pts is more reliable than assuming decoded order matches index directly after seek
+            found_frame_obj = decode_to(stream, temp_frame_generator, target_pts, self.frame_duration)
             
             if found_frame_obj:
-                print(f"Retrieved frame for index {frame_index} (PTS: {found_frame_obj.pts})")
+                self._index_decoder = (temp_frame_generator, found_frame_obj.pts)
+                self._cache_frame(frame_index, found_frame_obj)
+                logger.debug("Retrieved frame for index %s (PTS: %s)", frame_index, found_frame_obj.pts)
                 return found_frame_obj
             else:
                 print(f"Warning: Could not find exact frame for index {frame_index} after seeking.")
@@ -263,19 +574,47 @@ class VideoModel(QObject):
 
         except Exception as e:
             print(f"Error seeking/decoding frame {frame_index}: {e}")
+            self._close_preview()  # Reopened fresh by the next call
             return None
-        finally:
-            # IMPORTANT: Seek back to the original position to not disrupt playback state
-            # This is inefficient but necessary if we don't want get_frame_by_index to change the current frame
-            if self.current_frame_index != original_frame_index:
-                 print(f"Seeking back to original frame index {original_frame_index}")
-                 self.seek(original_frame_index)
     
+    def _close_preview(self):
+        """Close get_frame_by_index's container"""
+        self._index_decoder = None
+        if self._preview_container is not None:
+            self._preview_container.close()
+        self._preview_container = None
+    
+    def _cached_frame(self, frame_index):
+        """Return a frame from the decoded frame cache, or None"""
+        frame = self._frame_cache.get(frame_index)
+        if frame is not None:
+            self._frame_cache.move_to_end(frame_index)
+        return frame
+
+    def _cache_frame(self, frame_index, frame):
+        """Keep a decoded frame for later revisits, dropping the least recently used"""
+        self._frame_cache[frame_index] = frame
+        self._frame_cache.move_to_end(frame_index)
+        if len(self._frame_cache) > self.FRAME_CACHE_SIZE:
+            self._frame_cache.popitem(last=False)
+
     def reset_to_start(self):
         """Reset to the first frame"""
         if self.container is None:
             return
             
+        self._stop_read_ahead(discard=True)
+        if self._first_frame is not None:
+            # Shown from the frame kept by load_video; like a prefetch hit, the decoder
+            # only seeks back when the next frame is actually needed
+            self.current_frame = self._first_frame
+            self.current_frame_index = 0
+            self._decoder_stale = True
+            self.frame_changed.emit(self.current_frame)
+            self.current_frame_index_changed.emit(self.current_frame_index)
+            self._emit_rectangles_for_current_frame()
+            return
+        self._decoder_stale = False
         self.current_frame_index = 0
         self.container.seek(self.first_frame_pts)
         self.frame_generator = self.container.decode(video=0)
@@ -289,27 +628,55 @@ class VideoModel(QObject):
         # Ensure frame_index is within bounds
         frame_index = max(0, min(frame_index, self.frame_count - 1))
 
-        print(f"Seeking to frame {frame_index}")
+        logger.debug("Seeking to frame %s", frame_index)
+
+        # The playback decoder sits right after the shown frame only when nothing was read ahead
+        decoder_at_current = (not self._decoder_stale and self._read_ahead_thread is None
+                              and not self._read_ahead and not self._read_ahead_done
+                              and self.frame_generator is not None and self.current_frame is not None)
+
+        # Buffered frames belong to the old position
+        self._stop_read_ahead(discard=True)
+
+        # A prefetched or recently decoded frame is shown as is; the decoder catches up only
+        # when it is next used
+        prefetched = self._prefetch_worker.get(frame_index)
+        if prefetched is None:
+            prefetched = self._cached_frame(frame_index)
+        if prefetched is not None:
+            self.current_frame = prefetched
+            self.current_frame_index = frame_index
+            self._decoder_stale = True
+            self.frame_changed.emit(self.current_frame)
+            self.current_frame_index_changed.emit(self.current_frame_index)
+            self._emit_rectangles_for_current_frame()
+            if self.is_playing:
+                self._start_read_ahead()  # Resyncs the decoder to the shown frame first
+            return
+        self._decoder_stale = False
             
         # Calculate target PTS
-        target_pts = self.first_frame_pts + (frame_index * self.frame_duration)
-        
-        # Seek to the nearest keyframe before our target
-        self.container.seek(target_pts, stream=self.stream, backward=True)
-        
-        # Scan forward to find the exact frame we want
-        self.frame_generator = self.container.decode(video=0)
-        found_frame = False
-        while not found_frame:
-            try:
-                frame = next(self.frame_generator)
-                if frame.pts >= target_pts:
-                    self.current_frame = frame
-                    found_frame = True
-            except StopIteration:
-                break
+        target_pts = self.frame_pts(frame_index)
+        keyframe_pts = self._keyframe_before(target_pts)
+
+        frame = None
+        if (decoder_at_current and keyframe_pts is not None
+                and keyframe_pts <= self.current_frame.pts < target_pts):
+            # Same GOP, ahead of the shown frame: decoding on is never longer than the
+            # seek's run from the keyframe
+            frame = decode_to(self.stream, self.frame_generator, target_pts, self.frame_duration)
+        if frame is None:
+            # Seek to the nearest keyframe before our target, exactly when it is indexed
+            self.container.seek(target_pts if keyframe_pts is None else keyframe_pts,
+                                stream=self.stream, backward=True)
+            
+            # Scan forward to find the exact frame we want
+            self.frame_generator = self.container.decode(video=0)
+            frame = decode_to(self.stream, self.frame_generator, target_pts, self.frame_duration)
         
-        if found_frame:
+        if frame is not None:
+            self._cache_frame(frame_index, frame)
+            self.current_frame = frame
             self.current_frame_index = frame_index
             self.frame_changed.emit(self.current_frame)
             self.current_frame_index_changed.emit(self.current_frame_index)
@@ -319,6 +686,8 @@ class VideoModel(QObject):
         else:
             # If we couldn't find the frame, reset to start
             self.reset_to_start()
+        if self.is_playing:
+            self._start_read_ahead()  # The seek stopped it; playback keeps decoding off the GUI thread
     
     def advance_frame(self):
         """Advance to the next frame"""
@@ -334,26 +703,171 @@ class VideoModel(QObject):
         else:
             self._load_frame()
     
+    def advance_frames(self, count):
+        """Advance count frames, emitting only the last: the ones passed over are decoded but never shown"""
+        if self.container is None or self.frame_generator is None:
+            return
+        if self._decoder_stale:
+            self._resync_decoder()
+        try:
+            for _ in range(count - 1):
+                # The last frame and the end of the video are left to advance_frame
+                if self.current_frame_index + 1 >= self.frame_count - 1:
+                    break
+                self._next_frame()  # No frame_changed, so the view never converts it
+                self.current_frame_index += 1
+        except StopIteration:
+            pass  # advance_frame runs into it again and ends playback
+        self.advance_frame()
+
     def toggle_playback(self):
         """Toggle between play and pause states"""
         self.is_playing = not self.is_playing
+        if self.is_playing:
+            self._start_read_ahead()
+        else:
+            # Buffered frames stay queued, so stepping or resuming continues from them
+            self._stop_read_ahead()
         self.playback_state_changed.emit(self.is_playing)
         return self.is_playing
     
+    # --- Playback Read-Ahead ---
+    def _start_read_ahead(self):
+        """Start decoding frames ahead of playback on a worker thread"""
+        if self._decoder_stale and self._read_ahead_thread is None:
+            self._resync_decoder()
+        if self._read_ahead_thread is not None or self.frame_generator is None:
+            return
+        self._read_ahead_stop = False
+        self._read_ahead_done = False
+        self._read_ahead_thread = threading.Thread(
+            target=self._read_ahead_loop, args=(self.frame_generator,), daemon=True
+        )
+        self._read_ahead_thread.start()
+
+    def _stop_read_ahead(self, discard=False):
+        """Stop the read-ahead worker; buffered frames are kept unless discard is set"""
+        thread = self._read_ahead_thread
+        if thread is not None:
+            with self._read_ahead_cond:
+                self._read_ahead_stop = True
+                self._read_ahead_cond.notify_all()
+            thread.join()
+            self._read_ahead_thread = None
+        if discard:
+            self._read_ahead.clear()
+            self._read_ahead_done = False
+
+    def _read_ahead_loop(self, frame_generator):
+        """Worker: decode into the buffer until stopped or out of frames, pausing while it is full"""
+        cond = self._read_ahead_cond
+        while True:
+            with cond:
+                while len(self._read_ahead) >= self.READ_AHEAD_FRAMES and not self._read_ahead_stop:
+                    cond.wait()
+                if self._read_ahead_stop:
+                    return
+
+            # Decode outside the lock so the GUI thread can keep popping frames meanwhile
+            try:
+                frame = next(frame_generator)
+            except StopIteration:
+                frame = None
+            except Exception as e:
+                self._read_ahead_error = e
+                frame = None
+
+            with cond:
+                if frame is None:
+                    self._read_ahead_done = True
+                    cond.notify_all()
+                    return
+                # Keep every decoded frame, so buffer + generator always stay in sequence
+                self._read_ahead.append(frame)
+                cond.notify_all()
+
+    def _next_frame(self):
+        """Return the next frame in decode order, taking it from the read-ahead buffer first"""
+        with self._read_ahead_cond:
+            # While the worker is running, wait for it instead of touching the decoder
+            while (not self._read_ahead and self._read_ahead_thread is not None
+                   and not self._read_ahead_done):
+                self._read_ahead_cond.wait()
+            if self._read_ahead:
+                frame = self._read_ahead.popleft()
+                self._read_ahead_cond.notify_all()  # Room for the worker to decode another
+                return frame
+            if self._read_ahead_done:
+                if self._read_ahead_error is not None:
+                    print(f"Error decoding ahead: {self._read_ahead_error}")
+                    self._read_ahead_error = None
+                raise StopIteration
+        return next(self.frame_generator)
+
+    # --- Seek Prefetch ---
+    def _schedule_prefetch(self, frame_index):
+        """Restart the idle timer after every frame change (never fires while playing)"""
+        if not self.is_playing and self.container is not None:
+            self._prefetch_timer.start()
+
+    def _request_prefetch(self):
+        """Ask the prefetch worker for the frames the next seek most likely lands on"""
+        if self.is_playing or self.container is None or self.first_frame_pts is None:
+            return
+        current = self.current_frame_index
+        candidates = []
+        # Neighbouring labeled frames first: reviewing labels jumps straight between them
+        labeled = self.get_frames_with_rectangles()
+        pos = bisect.bisect_left(labeled, current)
+        if pos > 0:
+            candidates.append(labeled[pos - 1])
+        if pos < len(labeled) and labeled[pos] == current:
+            pos += 1
+        if pos < len(labeled):
+            candidates.append(labeled[pos])
+        # Then the button targets; +1 is left out since stepping forward just decodes on
+        candidates += [current - 1, current + 10, current - 10]
+        targets = [i for i in dict.fromkeys(candidates) if 0 <= i < self.frame_count and i != current]
+        if targets:
+            generation = self._prefetch_worker.cancel()  # Older requests are out of date now
+            self._prefetch_requested.emit(generation, self.file_path, self.frame_duration,
+                                          [(i, self.frame_pts(i)) for i in targets])
+
+    def _resync_decoder(self):
+        """Move the playback decoder just past the displayed frame"""
+        self._decoder_stale = False
+        self._stop_read_ahead(discard=True)
+        shown_pts = self.current_frame.pts
+        self.container.seek(shown_pts, stream=self.stream, backward=True)
+        self.frame_generator = self.container.decode(video=0)
+        decode_to(self.stream, self.frame_generator, shown_pts, self.frame_duration)
+        if self.is_playing:
+            self._start_read_ahead()
+
     def get_frame_rate(self):
         """Get the video's frame rate"""
         return self.stream.average_rate if self.stream else 0
     
     def cleanup(self):
         """Clean up resources"""
+        self._stop_read_ahead(discard=True)
+        self._prefetch_timer.stop()
+        self._prefetch_worker.clear()
+        self._decoder_stale = False
+        self._close_preview()
         if self.container:
             self.container.close()
         self.container = None
         self.stream = None
         self.current_frame = None
+        self._first_frame = None
         self.frame_generator = None
         self.first_frame_pts = None
+        self._pts_index = None
+        self._keyframe_pts = None
+        self._frame_cache.clear()
         self.frame_duration = None
+        self._frame_step = None
         self.frame_count = 0
         self.current_frame_index = 0
         self.is_playing = False
@@ -361,7 +875,9 @@ class VideoModel(QObject):
         # self.project_id = None 
         self.video_id = None
         self.video_name = None
+        self.file_path = None
         self.rectangles = {}  # Clear rectangles
+        self._labeled_frames = None
         
         # Don't close DB connection here, manage it at application level
         # if self.db:
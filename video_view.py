@@ -1,25 +1,32 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QPushButton, QLabel, QSlider, QFileDialog, QFormLayout,
-    QComboBox, QListWidget, QListWidgetItem, QLineEdit, QMessageBox,
-    QInputDialog, QTextEdit, QDialog, QDialogButtonBox
+    QComboBox, QListView, QLineEdit, QMessageBox,
+    QInputDialog, QPlainTextEdit, QDialog, QDialogButtonBox
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, Slot, QAbstractListModel, QModelIndex, QTimer
 from PySide6.QtGui import QImage, QShortcut, QKeySequence, QTextCursor
 from video_display import VideoDisplay
 import sys
 import logging
+import threading
+import bisect
 
 # --- Training Log Dialog --- 
 class TrainingLogDialog(QDialog):
+    LOG_FLUSH_MS = 50  # Captured output is appended at most this often, in one insert
+    LOG_MAX_LINES = 5000  # Older lines are dropped, so long runs don't slow every append
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Training Log")
         self.setMinimumSize(600, 400)
         
         layout = QVBoxLayout(self)
-        self.log_text_edit = QTextEdit(self)
+        # Plain text: no rich-text layout per append, and the document can be capped
+        self.log_text_edit = QPlainTextEdit(self)
         self.log_text_edit.setReadOnly(True)
+        self.log_text_edit.setMaximumBlockCount(self.LOG_MAX_LINES)
         layout.addWidget(self.log_text_edit)
         
         # Add stop button
@@ -36,12 +43,19 @@ class TrainingLogDialog(QDialog):
         
         # Create our custom stream
         self.log_stream = LogStream(self)
+        # Writes only buffer; a burst of prints becomes one text insert per tick
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(self.LOG_FLUSH_MS)
+        self._flush_timer.timeout.connect(self._flush_log)
+        self._flush_timer.start()
         
-        # Set up logging to capture all output
-        self.setup_logging()
+        # Output is captured only while the dialog is shown (see showEvent)
+        self.log_handler = None
 
     def setup_logging(self):
         """Set up logging to capture all output"""
+        if self.log_handler is not None:
+            return  # Already capturing; a second handler would log every line twice
         # Configure root logger
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
@@ -59,9 +73,13 @@ class TrainingLogDialog(QDialog):
 
     def restore_logging(self):
         """Restore original logging configuration"""
+        self._flush_log()
+        if self.log_handler is None:
+            return  # Never shown, so nothing was redirected
         # Remove our handler from the root logger
         root_logger = logging.getLogger()
         root_logger.removeHandler(self.log_handler)
+        self.log_handler = None
         
         # Restore original stdout and stderr
         sys.stdout = self.original_stdout
@@ -79,21 +97,41 @@ class TrainingLogDialog(QDialog):
 
     def append_text(self, text):
         """Appends text to the log and scrolls to the bottom."""
+        self._flush_log()  # Captured output written before this goes first
+        self._insert_text(text)
+
+    def _flush_log(self):
+        """Append everything the log stream has buffered since the last tick"""
+        chunks = self.log_stream.take()
+        if chunks:
+            self._insert_text("".join(chunks))
+
+    def _insert_text(self, text):
         self.log_text_edit.moveCursor(QTextCursor.End)
         self.log_text_edit.insertPlainText(text)
         self.log_text_edit.moveCursor(QTextCursor.End)
     
     def clear_text(self):
+        self.log_stream.take()  # Pending output belongs to what is being cleared
         self.log_text_edit.clear()
 
 class LogStream:
-    """A stream-like object that writes to the log dialog"""
+    """A stream-like object that buffers text for the log dialog to append"""
     def __init__(self, dialog):
         self.dialog = dialog
+        self._buf = []
+        self._lock = threading.Lock()  # print() may be called from any thread
 
     def write(self, text):
         if text.strip():  # Only send non-empty lines
-            self.dialog.append_text(text)
+            with self._lock:
+                self._buf.append(text)
+
+    def take(self):
+        """Return and clear the buffered chunks"""
+        with self._lock:
+            chunks, self._buf = self._buf, []
+        return chunks
 
     def flush(self):
         pass
@@ -101,19 +139,73 @@ class LogStream:
     def isatty(self):
         return False
 
+# --- Labeled Frames Model ---
+class LabeledFramesModel(QAbstractListModel):
+    """List model over a sorted list of labeled frame numbers.
+
+    Adding or removing a frame notifies the view about just that row, so the list
+    is never rebuilt item by item, and the view only creates rows that are visible.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frames = []  # Sorted frame numbers
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.frames)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(self.frames[index.row()])
+        if role == Qt.UserRole:
+            return self.frames[index.row()]  # Frame number, used by the controller to seek
+        return None
+
+    def set_frames(self, frame_numbers):
+        """Replace all frames"""
+        self.beginResetModel()
+        self.frames = sorted(frame_numbers)
+        self.endResetModel()
+
+    def insert_frame(self, frame_num):
+        """Insert a frame at its sorted position (no-op if already listed)"""
+        row = bisect.bisect_left(self.frames, frame_num)
+        if row < len(self.frames) and self.frames[row] == frame_num:
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.frames.insert(row, frame_num)
+        self.endInsertRows()
+
+    def remove_frame(self, frame_num):
+        """Remove a frame if it is listed"""
+        row = bisect.bisect_left(self.frames, frame_num)
+        if row < len(self.frames) and self.frames[row] == frame_num:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.frames[row]
+            self.endRemoveRows()
+
+    def row_of(self, frame_num):
+        """Return the row of a frame, or -1 if it isn't listed"""
+        row = bisect.bisect_left(self.frames, frame_num)
+        return row if row < len(self.frames) and self.frames[row] == frame_num else -1
+
 # --- Main Video View --- 
 class VideoView(QMainWindow):
     # Add signals for new shortcuts
     navigate_labeled_up = Signal()
     navigate_labeled_down = Signal()
+    stop_training_requested = Signal()  # The log dialog's stop button, once the dialog exists
+    CURSOR_LABEL_MS = 30  # The cursor label is redrawn at most this often while the mouse moves
 
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Video Labeling Tool")
         self.setMinimumSize(1200, 600)
         
-        # Create the log dialog instance but don't show it yet
-        self.training_log_dialog = TrainingLogDialog(self)
+        # The log dialog is created the first time training needs it (see _ensure_log_dialog)
+        self.training_log_dialog = None
+        self._name_dialog = None  # Input dialog for new project/class names, built on first prompt
         
         # Create the main widget and layout
         self.main_widget = QWidget()
@@ -215,7 +307,10 @@ class VideoView(QMainWindow):
 
         # Labeled Frames List Area
         self.labeled_frames_label = QLabel("Frames with Labels:")
-        self.labeled_frames_list = QListWidget()
+        self.labeled_frames_model = LabeledFramesModel(self)
+        self.labeled_frames_list = QListView()
+        self.labeled_frames_list.setModel(self.labeled_frames_model)
+        self.labeled_frames_list.setUniformItemSizes(True)  # Rows are all one line of text
         # self.labeled_frames_list.setFixedHeight(150) # Or let it stretch
         self.form_layout.addWidget(self.labeled_frames_label)
         self.form_layout.addWidget(self.labeled_frames_list)
@@ -237,44 +332,58 @@ class VideoView(QMainWindow):
         # Set up keyboard shortcuts
         self._setup_shortcuts()
         
-        # Connect signals for the view itself
-        self.video_display.cursor_position_changed.connect(self.update_cursor_position)
+        # Connect signals for the view itself. Mouse moves only record the position; the
+        # label shows the latest one when the timer fires
+        self._pending_cursor_position = None
+        self._cursor_label_timer = QTimer(self)
+        self._cursor_label_timer.setSingleShot(True)
+        self._cursor_label_timer.setInterval(self.CURSOR_LABEL_MS)
+        self._cursor_label_timer.timeout.connect(self._show_pending_cursor_position)
+        self.video_display.cursor_position_changed.connect(self._queue_cursor_position)
     
     def _setup_shortcuts(self):
         """Set up keyboard shortcuts for video navigation and list navigation"""
         # Open Video Shortcut (New)
-        open_video_shortcut = QShortcut(QKeySequence("Ctrl+O"), self)
-        open_video_shortcut.activated.connect(lambda: self.open_button.click())
+        open_video_shortcut = QShortcut(QKeySequence(Qt.CTRL | Qt.Key_O), self)
+        open_video_shortcut.activated.connect(self.open_button.click)
 
         # Left arrow: Previous frame
         prev_frame_shortcut = QShortcut(QKeySequence(Qt.Key_Left), self)
-        prev_frame_shortcut.activated.connect(lambda: self.prev_frame.click())
+        prev_frame_shortcut.activated.connect(self.prev_frame.click)
         
         # Right arrow: Next frame
         next_frame_shortcut = QShortcut(QKeySequence(Qt.Key_Right), self)
-        next_frame_shortcut.activated.connect(lambda: self.next_frame.click())
+        next_frame_shortcut.activated.connect(self.next_frame.click)
         
         # Shift+Left arrow: Previous 10 frames (Changed)
-        prev_10_frames_shortcut = QShortcut(QKeySequence("Shift+Left"), self)
+        prev_10_frames_shortcut = QShortcut(QKeySequence(Qt.SHIFT | Qt.Key_Left), self)
         # Restore original connection
-        prev_10_frames_shortcut.activated.connect(lambda: self.prev_10_frames.click())
+        prev_10_frames_shortcut.activated.connect(self.prev_10_frames.click)
         
         # Shift+Right arrow: Next 10 frames (Changed)
-        next_10_frames_shortcut = QShortcut(QKeySequence("Shift+Right"), self)
+        next_10_frames_shortcut = QShortcut(QKeySequence(Qt.SHIFT | Qt.Key_Right), self)
         # Restore original connection
-        next_10_frames_shortcut.activated.connect(lambda: self.next_10_frames.click())
+        next_10_frames_shortcut.activated.connect(self.next_10_frames.click)
         
         # Space: Play/Pause
         play_pause_shortcut = QShortcut(QKeySequence(Qt.Key_Space), self)
-        play_pause_shortcut.activated.connect(lambda: self.play_button.click())
+        play_pause_shortcut.activated.connect(self.play_button.click)
 
         # Ctrl+Left arrow: Navigate Labeled Frames List Up (New)
-        navigate_up_shortcut = QShortcut(QKeySequence("Ctrl+Left"), self)
+        navigate_up_shortcut = QShortcut(QKeySequence(Qt.CTRL | Qt.Key_Left), self)
         navigate_up_shortcut.activated.connect(self.navigate_labeled_up.emit)
 
         # Ctrl+Right arrow: Navigate Labeled Frames List Down (New)
-        navigate_down_shortcut = QShortcut(QKeySequence("Ctrl+Right"), self)
+        navigate_down_shortcut = QShortcut(QKeySequence(Qt.CTRL | Qt.Key_Right), self)
         navigate_down_shortcut.activated.connect(self.navigate_labeled_down.emit)
+
+        # Scoped to this view and its children, so they stay local if it is ever embedded
+        self._shortcuts = [
+            open_video_shortcut, prev_frame_shortcut, next_frame_shortcut, prev_10_frames_shortcut,
+            next_10_frames_shortcut, play_pause_shortcut, navigate_up_shortcut, navigate_down_shortcut,
+        ]
+        for shortcut in self._shortcuts:
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)
     
     def get_open_file_path(self):
         """Open a file dialog to select a video file"""
@@ -283,30 +392,51 @@ class VideoView(QMainWindow):
         )
         return file_path
     
+    @Slot(object)
     def display_frame(self, frame):
         """Display a frame in the video display"""
         self.video_display.display_frame(frame)
     
+    @Slot(int, int)
     def update_frame_counter(self, current_frame, total_frames):
         """Update the frame counter label"""
         self.frame_counter.setText(f"Frame: {current_frame} / {total_frames}")
     
+    @Slot(int, int)
     def update_seek_slider(self, current_frame, total_frames):
         """Update the seek slider"""
         # Block signals temporarily to prevent feedback loop if model updates slider
         self.seek_slider.blockSignals(True)
-        self.seek_slider.setRange(0, max(0, total_frames - 1)) # Ensure range is non-negative
+        maximum = max(0, total_frames - 1) # Ensure range is non-negative
+        if self.seek_slider.maximum() != maximum:  # Only changes when a video is opened
+            self.seek_slider.setRange(0, maximum)
         self.seek_slider.setValue(current_frame)
         self.seek_slider.blockSignals(False)
     
+    @Slot(bool)
     def update_play_button(self, is_playing):
         """Update the play button text based on playback state"""
         self.play_button.setText("⏸" if is_playing else "▶")
     
+    @Slot(float)
     def update_fps(self, fps):
         """Update the FPS label"""
         self.fps_label.setText(f"FPS: {fps:.2f}")
     
+    @Slot(int, int)
+    def _queue_cursor_position(self, x, y):
+        """Remember the latest cursor position and schedule a label update"""
+        self._pending_cursor_position = (x, y)
+        if not self._cursor_label_timer.isActive():
+            self._cursor_label_timer.start()
+
+    @Slot()
+    def _show_pending_cursor_position(self):
+        if self._pending_cursor_position is not None:
+            self.update_cursor_position(*self._pending_cursor_position)
+            self._pending_cursor_position = None
+
+    @Slot(int, int)
     def update_cursor_position(self, x, y):
         """Update the cursor position label"""
         if x >= 0 and y >= 0:
@@ -345,8 +475,7 @@ class VideoView(QMainWindow):
 
     def get_new_project_name(self):
          """Prompt user for a new project name"""
-         name, ok = QInputDialog.getText(self, "New Project", "Enter project name:")
-         return name if ok and name else None
+         return self._prompt_name("New Project", "Enter project name:")
 
     def populate_current_class_dropdown(self, classes):
         """Populate the current class dropdown for drawing"""
@@ -365,33 +494,41 @@ class VideoView(QMainWindow):
 
     def get_new_class_name(self):
         """Prompt user for a new class name"""
-        name, ok = QInputDialog.getText(self, "New Class", "Enter class name:")
+        return self._prompt_name("New Class", "Enter class name:")
+
+    def _prompt_name(self, title, label):
+        """Ask for a name in one reused input dialog; returns None if cancelled or empty"""
+        if self._name_dialog is None:
+            self._name_dialog = QInputDialog(self)
+            self._name_dialog.setInputMode(QInputDialog.TextInput)
+        self._name_dialog.setWindowTitle(title)
+        self._name_dialog.setLabelText(label)
+        self._name_dialog.setTextValue("")
+        ok = self._name_dialog.exec() == QDialog.Accepted
+        name = self._name_dialog.textValue()
         return name if ok and name else None
 
     def populate_labeled_frames_list(self, frame_numbers):
         """Populate the list with frame numbers that have labels"""
-        current_selection = self.labeled_frames_list.currentRow()
-        current_frame_data = self.labeled_frames_list.currentItem().data(Qt.UserRole) if self.labeled_frames_list.currentItem() else None
-
-        self.labeled_frames_list.clear()
-        new_row_map = {}
-        row_index = 0
-        for frame_num in sorted(frame_numbers): # Ensure sorted order
-            item = QListWidgetItem(str(frame_num))
-            item.setData(Qt.UserRole, frame_num) # Store frame number in data
-            self.labeled_frames_list.addItem(item)
-            new_row_map[frame_num] = row_index
-            row_index += 1
+        current_selection = self.labeled_frames_list.currentIndex().row()
+        current_frame_data = self.labeled_frames_list.currentIndex().data(Qt.UserRole)
+
+        self.labeled_frames_model.set_frames(frame_numbers)
 
         # Try to restore selection
-        if current_frame_data in new_row_map:
-            self.labeled_frames_list.setCurrentRow(new_row_map[current_frame_data])
-        elif current_selection != -1 and current_selection < self.labeled_frames_list.count():
-             self.labeled_frames_list.setCurrentRow(current_selection) # Fallback to old index if possible
+        row = self.labeled_frames_model.row_of(current_frame_data) if current_frame_data is not None else -1
+        if row == -1 and current_selection < self.labeled_frames_model.rowCount():
+            row = current_selection  # Fallback to old index if possible
+        if row != -1:
+            self.labeled_frames_list.setCurrentIndex(self.labeled_frames_model.index(row))
+
+    def insert_labeled_frame(self, frame_num):
+        """Insert one frame number into the labeled frames list, keeping it sorted"""
+        self.labeled_frames_model.insert_frame(frame_num)
 
     def clear_labeled_frames_list(self):
         """Clear the list of labeled frames"""
-        self.labeled_frames_list.clear()
+        self.labeled_frames_model.set_frames([])
 
     def show_error_message(self, title, message):
         """Display an error message box"""
@@ -404,28 +541,46 @@ class VideoView(QMainWindow):
     # --- Methods to handle list navigation (called by Controller) ---
     def select_labeled_frame_item(self, row_index):
         """Selects the item at the given row index in the labeled frames list."""
-        if 0 <= row_index < self.labeled_frames_list.count():
-            self.labeled_frames_list.setCurrentRow(row_index)
+        if 0 <= row_index < self.labeled_frames_model.rowCount():
+            index = self.labeled_frames_model.index(row_index)
+            self.labeled_frames_list.setCurrentIndex(index)
             # Ensure the selected item is visible
-            self.labeled_frames_list.scrollToItem(self.labeled_frames_list.item(row_index))
-            return self.labeled_frames_list.item(row_index)
+            self.labeled_frames_list.scrollTo(index)
+            return index
         return None
 
     def get_current_labeled_frame_index(self):
         """Returns the row index of the currently selected item, or -1 if none."""
-        return self.labeled_frames_list.currentRow()
+        return self.labeled_frames_list.currentIndex().row()
 
     def get_labeled_frame_count(self):
         """Returns the number of items in the labeled frames list."""
-        return self.labeled_frames_list.count() 
+        return self.labeled_frames_model.rowCount() 
     # --- Log Dialog Methods --- 
+    def _ensure_log_dialog(self):
+        """Return the log dialog, creating it on first use"""
+        if self.training_log_dialog is None:
+            self.training_log_dialog = TrainingLogDialog(self)
+            self.training_log_dialog.stop_button.clicked.connect(self.stop_training_requested)
+        return self.training_log_dialog
+
     def show_log_dialog(self):
-        self.training_log_dialog.show()
-        self.training_log_dialog.raise_() # Bring to front
-        self.training_log_dialog.activateWindow()
+        dialog = self._ensure_log_dialog()
+        dialog.show()
+        dialog.raise_() # Bring to front
+        dialog.activateWindow()
 
     def append_log_text(self, text):
-        self.training_log_dialog.append_text(text)
+        self._ensure_log_dialog().append_text(text)
         
     def clear_log_dialog(self):
-        self.training_log_dialog.clear_text() 
+        self._ensure_log_dialog().clear_text()
+
+    def set_stop_training_enabled(self, enabled):
+        """Enable or disable the log dialog's stop button"""
+        self._ensure_log_dialog().stop_button.setEnabled(enabled)
+
+    def close_log_dialog(self):
+        """Close the log dialog if it was ever created, restoring stdout and stderr"""
+        if self.training_log_dialog is not None:
+            self.training_log_dialog.close()